@@ -1,150 +1,313 @@
 import os
 import sys
 import asyncio
+import importlib
+import re
 import threading
 import time
-import speech_recognition as sr
-import pyttsx3
 from dotenv import load_dotenv
 
-# ADK & Google AI
-from google.adk.agents import Agent
-from google.adk.runners import InMemoryRunner
-from google.genai import types
-from google.adk.models.google_llm import Gemini
+LAUNCH = time.perf_counter()
 
-# Local Modules
-import prediction
+# Heavy modules (Google ADK, prediction -> pandas / scikit-learn, the model
+# and TensorFlow behind it, speech_recognition, pyttsx3) are NOT imported
+# here: preload() imports them in a background thread while the serial
+# bridge starts, and every function also imports what it needs on first use.
+# `python app.py --startup-profile` prints where the start-up time goes.
 
 # Add parent dir to find stream_audio.py
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-import stream_audio
 
 # --- CONFIGURATION ---
 load_dotenv()
-if not os.environ.get("GOOGLE_API_KEY"):
+if not os.environ.get("GOOGLE_API_KEY") and "--startup-profile" not in sys.argv:
     print("CRITICAL: GOOGLE_API_KEY not found.")
     sys.exit(1)
 
-# --- TOOLS ---
-def transcribe(path: str) -> str:
-    r = sr.Recognizer()
-    with sr.AudioFile(path) as source:
-        audio = r.record(source)
-    return r.recognize_google(audio, language="en-US")
+# --- STARTUP ---
+STARTUP = {}                       # stage -> seconds
+FAILED = set()                     # stages that raised
+IMPORTS_DONE = threading.Event()   # everything but the model is loaded
+
+PRELOAD_STAGES = [
+    ("google adk / genai", ["google.genai.types", "google.adk.agents",
+                            "google.adk.runners", "google.adk.models.google_llm"]),
+    ("prediction (pandas, caches)", ["prediction", "forecast_cache", "refresher"]),
+    ("speech_recognition", ["speech_recognition"]),
+    ("pyttsx3", ["pyttsx3"]),
+]
+
 
-def text_to_speech(text: str, out_path: str):
+def _timed(stage, fn):
+    start = time.perf_counter()
     try:
-        engine = pyttsx3.init()
-        # Try to find a female voice (Zira)
-        voices = engine.getProperty('voices')
-        for v in voices:
-            if "zira" in v.name.lower() or "female" in v.name.lower():
-                engine.setProperty('voice', v.id)
-                break
-        engine.save_to_file(text, out_path)
-        engine.runAndWait()
+        return fn()
     except Exception as e:
-        print(f"TTS Error: {e}")
+        FAILED.add(stage)
+        print(f"Preload of {stage} failed: {e}")
+    finally:
+        STARTUP[stage] = time.perf_counter() - start
+
+
+def preload(model=True):
+    """Import the heavy modules, then load and warm up the model."""
+    for stage, modules in PRELOAD_STAGES:
+        _timed(stage, lambda: [importlib.import_module(m) for m in modules])
+    IMPORTS_DONE.set()
+    if model:
+        _timed("model load + warm-up", lambda: importlib.import_module("prediction").REGISTRY.get())
+    # vosk model / speech_recognition before the first utterance
+    _timed("stt engine", lambda: importlib.import_module("stt").TRANSCRIBER.engine.load())
+    # engine init + voice lookup once, not on the first reply
+    _timed("tts engine + voice", lambda: importlib.import_module("tts_worker").TTS.render("Ready."))
+
+
+def startup_profile():
+    """Import-time breakdown of everything main() needs before READY."""
+    _timed("stream_audio (serial)", lambda: importlib.import_module("stream_audio"))
+    preload()
+    _timed("agent", build_agent)
+    total = time.perf_counter() - LAUNCH
+
+    print("\n--- Startup profile ---")
+    for stage, seconds in sorted(STARTUP.items(), key=lambda kv: kv[1], reverse=True):
+        note = "  (failed)" if stage in FAILED else ""
+        print(f"{stage:<30}{seconds:>8.3f}s {seconds / total:>6.1%}{note}")
+    print(f"{'total (launch -> ready)':<30}{total:>8.3f}s")
+    print("(python -X importtime app.py --startup-profile gives the per-module tree)")
+
+
+# --- TOOLS ---
+async def weather_tool(city_name: str) -> dict:
+    import prediction
+    from forecast_cache import FORECAST_CACHE
+    from refresher import REFRESHER
 
-def weather_tool(city_name: str) -> dict:
     print(f"DEBUG: calling weather_tool for {city_name}")
-    return prediction.predict_weather(city_name)
+    REFRESHER.record(city_name)
+    # awaited by the agent: HTTP is async, model work runs off the event loop.
+    # Fresh answers come from the cache, stale ones too (recomputed in the
+    # background), and concurrent asks for one city share a computation.
+    result = await FORECAST_CACHE.get(city_name, prediction.predict_weather_async)
+    print(f"DEBUG: forecast cache {FORECAST_CACHE.stats()}")
+    return result
 
 # --- AI AGENT ---
-retry_config = types.HttpRetryOptions(
-    attempts=5, exp_base=2, initial_delay=1, http_status_codes=[429, 500, 503]
-)
-
-weather_agent = Agent(
-    name="weather_predictor",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
-    instruction="""
-    You are a professional Weather assistant.
-    IMPORTANT: You cannot know the weather yourself. You MUST use the 'weather_tool'.
-    1. Identify the city name. If not found -> default to 'Bucharest'.
-    2. Call 'weather_tool(city_name)'.
-    3. Summarize the result in MAX 2 sentences (Conditions + Advice).
-    4. Start with: "Great, here are the results for [City Name]."
-    """,
-    tools=[weather_tool]
-)
+def build_agent():
+    from google.adk.agents import Agent
+    from google.genai import types
+    from google.adk.models.google_llm import Gemini
+
+    retry_config = types.HttpRetryOptions(
+        attempts=5, exp_base=2, initial_delay=1, http_status_codes=[429, 500, 503]
+    )
+
+    return Agent(
+        name="weather_predictor",
+        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        instruction="""
+        You are a professional Weather assistant.
+        IMPORTANT: You cannot know the weather yourself. You MUST use the 'weather_tool'.
+        1. Identify the city name. If not found -> default to 'Bucharest'.
+        2. Call 'weather_tool(city_name)'.
+        3. Summarize the result in MAX 2 sentences (Conditions + Advice).
+        4. Start with: "Great, here are the results for [City Name]."
+        """,
+        tools=[weather_tool]
+    )
+
+# --- ONE TURN ---
+APP_NAME = "weather_app"
+USER_ID = "user"
+
+# several ESP32s: ESP32_PORTS=COM3,COM4 (default: ask / auto-select one)
+ESP32_PORTS = [p for p in os.environ.get("ESP32_PORTS", "").split(",") if p]
+# turns (transcript -> agent -> speech) in flight at once, over all devices
+MAX_TURNS = int(os.environ.get("WEATHER_MAX_TURNS", 4))
+
+
+# the reply is spoken sentence by sentence while the rest is still generated
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_sentences(text):
+    """(complete sentences, unfinished rest) of streamed text."""
+    parts = SENTENCE_END.split(text)
+    return [p.strip() for p in parts[:-1] if p.strip()], parts[-1]
+
+
+async def speak(sentences, bridge, marks):
+    """Renders queued sentences one by one and queues them on the bridge (None ends)."""
+    from tts_worker import TTS
+    while True:
+        sentence = await sentences.get()
+        if sentence is None:
+            return
+        try:
+            pcm = await TTS.render_async(sentence)
+        except Exception as e:
+            print(f"TTS Error: {e}")
+            continue
+        marks.setdefault("first audio", time.perf_counter())
+        marks["last audio"] = time.perf_counter()
+        bridge.play_pcm(pcm)
+
+
+def report_latency(device, recorded_at, marks):
+    """Seconds from the end of the recording to each milestone of the turn."""
+    steps = " | ".join(f"{name} {at - recorded_at:.2f}s" for name, at in marks.items())
+    print(f"⏱️ [{device}] Turn latency: {steps}")
+
+
+async def handle_utterance(device, transcript, recorded_at, runner, bridge):
+    """One turn; cancelling it drops the transcript, the agent call and the unspoken sentences."""
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.genai import types
+
+    marks = {}
+
+    # A. Transcript (streaming engines have decoded most of it during the recording)
+    try:
+        user_text = await asyncio.wrap_future(transcript)
+        marks["stt"] = time.perf_counter()
+        print(f"[{device}] User said: '{user_text}'")
+    except Exception as e:
+        print(f"Transcription Error (ignoring): {e}")
+        return
+
+    # B. AI Response, streamed: partial events carry the new text only, the
+    # final (non partial) event of each response repeats all of it
+    content = types.Content(role="user", parts=[types.Part.from_text(text=user_text)])
+    sentences = asyncio.Queue()
+    speaker = asyncio.create_task(speak(sentences, bridge, marks))
+    pending = ""
+    streamed = False
+
+    # --- CRITICAL FIX: Create FRESH session for every request to avoid 'Session not found' ---
+    print("Creating fresh session...")
+    try:
+        session = await runner.session_service.create_session(user_id=USER_ID, app_name=APP_NAME)
+
+        run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+        async for event in runner.run_async(session_id=session.id, user_id=USER_ID,
+                                            new_message=content, run_config=run_config):
+            if not (event.content and event.content.parts):
+                continue
+            text = "".join(part.text for part in event.content.parts if part.text)
+            if event.partial:
+                if text:
+                    marks.setdefault("first text", time.perf_counter())
+                    streamed = True
+                    pending += text
+            else:
+                if text:
+                    print(f"Agent: {text}")
+                    if not streamed:
+                        marks.setdefault("first text", time.perf_counter())
+                        pending += text
+                    pending += " "      # the response is complete: flush its last sentence
+                streamed = False
+            done, pending = split_sentences(pending)
+            for sentence in done:
+                marks.setdefault("first sentence", time.perf_counter())
+                sentences.put_nowait(sentence)
+        if pending.strip():
+            sentences.put_nowait(pending.strip())
+    except Exception as e:
+        print(f"AI/Session Error: {e}")
+        import traceback
+        traceback.print_exc()
+    except asyncio.CancelledError:
+        # the speaker is gone before the turn counts as cancelled: nothing
+        # rendered for this turn can reach the bridge afterwards
+        speaker.cancel()
+        await asyncio.wait([speaker])
+        raise
+
+    sentences.put_nowait(None)
+    await speaker
+    print(f"🔊 [{device}] Reply sent to ESP32.")
+    report_latency(device, recorded_at, marks)
+
 
 # --- MAIN LOOP ---
 async def main():
     print("--- 🌦️ Weather AI Assistant 🌦️ ---")
-    
-    # 1. Start Audio Bridge (ESP32 <-> PC)
+
+    # 0. Heavy imports + model warm-up in the background
+    threading.Thread(target=preload, name="preload", daemon=True).start()
+
+    # 1. Start Audio Bridges (ESP32 <-> PC), one per device
     print("Initializing Audio Bridge...")
-    port = stream_audio.get_serial_port()
-    if not port:
+    import stream_audio
+    ports = ESP32_PORTS or [stream_audio.get_serial_port()]
+    if not all(ports):
         print("No serial port found. Exiting.")
         return
 
-    bridge = stream_audio.AudioBridge(port)
-    threading.Thread(target=bridge.listen, daemon=True).start()
-    
-    print("\nREADY! Press the button on your ESP32 to speak.")
+    # every chunk goes to the device's recognizer while the ESP32 is still
+    # recording; at the end of the recording its transcript (a Future) is
+    # queued here
+    from stt import TRANSCRIBER, Transcriber
+    loop = asyncio.get_running_loop()
+    utterances = asyncio.Queue()
+    bridges = {}
+
+    for port in ports:
+        # one recognizer thread per device, all sharing the loaded engine
+        transcriber = Transcriber(TRANSCRIBER.engine, name=f"stt-{port}")
+
+        def on_utterance(pcm, port=port, transcriber=transcriber):
+            transcript = transcriber.finish()
+            loop.call_soon_threadsafe(utterances.put_nowait, (port, pcm, transcript, time.perf_counter()))
+
+        bridges[port] = stream_audio.AudioBridge(port, on_utterance=on_utterance, on_chunk=transcriber.feed)
+        threading.Thread(target=bridges[port].listen, name=f"bridge-{port}", daemon=True).start()
+    print(f"Speech recognition: {TRANSCRIBER.engine.name}")
+
+    # the agent needs the ADK; the model may still be warming up, the
+    # first weather_tool call waits for it
+    await asyncio.to_thread(IMPORTS_DONE.wait)
+    from google.adk.runners import InMemoryRunner
+    from refresher import REFRESHER
+
+    # keep the most asked cities precomputed at every UTC hour
+    REFRESHER.start()
 
     # 2. Setup AI Runner
-    APP_NAME = "weather_app"
-    USER_ID = "user"
-    runner = InMemoryRunner(agent=weather_agent, app_name=APP_NAME)
-    
-    # 3. File Paths
-    audio_dir = "audio_folder"
-    audio_path = os.path.join(audio_dir, "audio.wav")
-    reply_path = os.path.join(audio_dir, "reply.wav")
-
-    # Cleanup old reply
-    if os.path.exists(reply_path):
-        try: os.remove(reply_path)
-        except: pass
-
-    last_mtime = 0
-    if os.path.exists(audio_path):
-        last_mtime = os.path.getmtime(audio_path)
-
-    # 4. Watch Loop
-    while True:
+    runner = InMemoryRunner(agent=build_agent(), app_name=APP_NAME)
+
+    print(f"\nREADY after {time.perf_counter() - LAUNCH:.1f}s! Press the button on your ESP32 to speak.")
+
+    # 3. One task per recording, so the loop is free for the next one: turns
+    # of different devices run side by side (at most MAX_TURNS), and a new
+    # recording from a device cancels the turn still running there
+    turns = {}
+    slots = asyncio.Semaphore(MAX_TURNS)
+
+    async def turn(port, transcript, recorded_at):
         try:
-            if os.path.exists(audio_path):
-                mtime = os.path.getmtime(audio_path)
-                if mtime > last_mtime:
-                    print("\n🎤 New audio detected! Processing...")
-                    last_mtime = mtime
-                    await asyncio.sleep(0.5) 
-                    
-                    # A. Transcribe
-                    try:
-                        user_text = transcribe(audio_path)
-                        print(f"User said: '{user_text}'")
-                    except Exception as e:
-                        print(f"Transcription Error (ignoring): {e}")
-                        continue
-
-                    # B. AI Response
-                    content = types.Content(role="user", parts=[types.Part.from_text(text=user_text)])
-                    
-                    # --- CRITICAL FIX: Create FRESH session for every request to avoid 'Session not found' ---
-                    print("Creating fresh session...")
-                    try:
-                        session = await runner.session_service.create_session(user_id=USER_ID, app_name=APP_NAME)
-                        
-                        async for event in runner.run_async(session_id=session.id, user_id=USER_ID, new_message=content):
-                             if event.content and event.content.parts:
-                                for part in event.content.parts:
-                                    if part.text:
-                                        print(f"Agent: {part.text}")
-                                        text_to_speech(part.text, reply_path)
-                                        print("🔊 Reply sent to ESP32.")
-                    except Exception as e:
-                         print(f"AI/Session Error: {e}")
-                         import traceback
-                         traceback.print_exc()
-
-            await asyncio.sleep(0.1)
+            async with slots:
+                await handle_utterance(port, transcript, recorded_at, runner, bridges[port])
+        except asyncio.CancelledError:
+            print(f"[{port}] Turn cancelled.")
+            raise
+        except Exception as e:
+            print(f"[{port}] Turn Error: {e}")
 
+    while True:
+        try:
+            port, pcm, transcript, recorded_at = await utterances.get()
+            print(f"\n🎤 [{port}] New audio ({len(pcm) / 16000:.1f}s)! Processing...")
+            previous = turns.get(port)
+            if previous is not None and not previous.done():
+                # wait for the cancellation to finish before clearing, or a
+                # sentence rendered meanwhile would be queued after the clear
+                previous.cancel()
+                await asyncio.wait([previous])
+            # a finished turn may still have sentences waiting to be played
+            bridges[port].clear_playback()
+            turns[port] = asyncio.create_task(turn(port, transcript, recorded_at))
         except KeyboardInterrupt:
             print("\nStopping...")
             break
@@ -152,145 +315,16 @@ async def main():
             print(f"Loop Error: {e}")
             await asyncio.sleep(1)
 
-if __name__ == "__main__":
-    asyncio.run(main())
+    for task in turns.values():
+        task.cancel()
+    await asyncio.gather(*turns.values(), return_exceptions=True)
+    # close the pooled Open-Meteo connections while their loop is still running
+    from http_client import ASYNC_HTTP
+    await ASYNC_HTTP.aclose()
 
-# import os
-# import sys
-# import asyncio
-# from dotenv import load_dotenv
 
-# # ADK Imports
-# from google.adk.agents import Agent
-# from google.adk.runners import InMemoryRunner
-# from google.genai import types
-# from google.adk.models.google_llm import Gemini
-
-# # prediction.py
-# import prediction
-
-# # speech rec
-# import speech_recognition as sr
-# from gtts import gTTS
-
-
-# def transcribe(path: str) -> str:
-#     r = sr.Recognizer()
-#     with sr.AudioFile(path) as source:
-#         audio = r.record(source)
-
-#     return r.recognize_google(audio,  language="en-US")
-
-
-# def text_to_speech(text: str, out_path: str):
-#     tts = gTTS(text=text, lang="en")
-#     tts.save(out_path)
-
-
-# # Load environment variables
-# load_dotenv()
-
-# if not os.environ.get("GOOGLE_API_KEY"):
-#     print("CRITICAL: GOOGLE_API_KEY not found. Please check your.env file or create one.")
-#     sys.exit(1)
-
-
-# def weather_tool(city_name: str) -> dict:
-#     """
-#     Get the current weather and forecast for a specific city.
-
-#     Args:
-#         city_name: The name of the city to look up.
-#     """
-#     return prediction.predict_weather(city_name)
-
-
-# retry_config = types.HttpRetryOptions(
-#     attempts=5,  # Maximum retry attempts
-#     exp_base=7,  # Delay multiplier
-#     initial_delay=1,  # Initial delay before first retry (in seconds)
-#     http_status_codes=[429, 500, 503, 504]  # Retry on these HTTP errors
-# )
-
-
-# weather_agent = Agent(
-#     name="weather_predictor",
-#     model=Gemini(
-#         model="gemini-2.5-flash-lite",
-#         retry_options=retry_config
-#     ),
-#     instruction="""
-#     You are a professional Weather assistant.
-#     1. Identify the city name from the user's request. if not identified -> default city name : Bucharest
-#     2. Call the 'weather_tool' passing the city name.
-#     3. Analyze the returned data (current_observation vs forecast). Give human friendly - short sentences. **MAX 2 sentences**
-#     4. Announce the weather condition and how it will change, say  in few next hours we will reach minus 1 degree with the wind ranging from (x to y)
-#     5. Give specific advice on what to wear and items to take.
-#     6. start with : Great, here are some results I found for ... ( the city name ) 
-#     """,
-#     tools=[weather_tool]
-# )
-
-# # --- 3. Main Interaction Loop ---
-
-
-# async def main():
-#     print("--- 🌦️ weather ai agent  🌦️ ---")
-#     print("Hi there! this is the Weather AI assistant. Tell me what I can help with?")
-
-#     APP_NAME = "weather_app"
-#     USER_ID = "local_user"
-#     runner = InMemoryRunner(agent=weather_agent, app_name=APP_NAME)
-
-#     # Create the session
-#     session = await runner.session_service.create_session(
-#         user_id=USER_ID,
-#         app_name=APP_NAME
-#     )
-
-#     # Save the ID as a string for use in the loop
-#     current_session_id = session.id
-#     print(f"DEBUG: Session Created with ID: {current_session_id}")
-
-#     audio_dir = "audio_folder"
-#     audio_path = os.path.join(audio_dir, "audio.wav")
-#     reply_path = os.path.join(audio_dir, "reply.wav")
-#     while True:
-#         try:
-#             user_input = input("\nUser: ").strip()
-#             if user_input.lower() in ["quit", "exit"]:
-#                 print("Exiting...")
-#                 break
-
-#             print("... Got it ! thinking...")
-#             try:
-#                 user_input = transcribe(audio_path)
-#             except Exception as e:
-#                 print("transcription failed", e)
-#                 continue
-
-#             # Prepare the content object (Multimodal structure)
-#             user_content = types.Content(
-#                 role="user",
-#                 parts=[types.Part.from_text(text=user_input)]
-#             )
-
-#             # Use run_async (Asynchronous Generator)
-#             async for event in runner.run_async(
-#                 session_id=current_session_id,
-#                 user_id=USER_ID,
-#                 new_message=user_content
-#             ):
-#                 if event.content and event.content.parts:
-#                     for part in event.content.parts:
-#                         if part.text:
-#                             text_to_speech(part.text, reply_path)
-#                             print(f"Agent: {part.text}")
-
-#         except Exception as e:
-#             print(f"Error occurred: {e}")
-#             import traceback
-#             traceback.print_exc()
-
-# if __name__ == "__main__":
-#     asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    if "--startup-profile" in sys.argv:
+        startup_profile()
+    else:
+        asyncio.run(main())
@@ -0,0 +1,286 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from numpy_lstm import KERAS_PATH, NPZ_PATH
+
+ONNX_PATH = "weather_lstm_6h_prediction.onnx"
+TFLITE_PATH = "weather_lstm_6h_prediction.tflite"
+
+PAST_HOURS = 24
+FEATURES = 16
+
+DEFAULT_PATHS = {
+    "keras": KERAS_PATH,
+    "numpy": NPZ_PATH,
+    "onnx": ONNX_PATH,
+    "tflite": TFLITE_PATH,
+}
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None if unknown)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # linux reports KB, macOS bytes
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+class ModelBackend:
+    """
+    Common interface of every runtime serving the forecast model.
+    predict(X) takes a (N, 24, 16) batch and returns the keras-like
+    [regression (N, 6, 3), classification (N, 6, 7)].
+    """
+
+    name = "base"
+
+    def __init__(self, path):
+        self.path = path
+        self.load_s = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.batches = 0
+        self.samples = 0
+        self.total_s = 0.0
+        self.last_batch_s = None
+
+    def load(self):
+        start = time.perf_counter()
+        self._load()
+        self.load_s = time.perf_counter() - start
+        return self
+
+    def _load(self):
+        raise NotImplementedError
+
+    def _run(self, X):
+        raise NotImplementedError
+
+    def predict(self, X, verbose=0):
+        X = np.asarray(X, dtype=np.float32)
+        start = time.perf_counter()
+        regression, classification = self._run(X)
+        elapsed = time.perf_counter() - start
+
+        self.batches += 1
+        self.samples += len(X)
+        self.total_s += elapsed
+        self.last_batch_s = elapsed
+        return [regression, classification]
+
+    def stats(self):
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "load_s": round(self.load_s, 4) if self.load_s is not None else None,
+            "batches": self.batches,
+            "samples": self.samples,
+            "last_batch_ms": round(self.last_batch_s * 1000, 3) if self.last_batch_s is not None else None,
+            "mean_batch_ms": round(self.total_s / self.batches * 1000, 3) if self.batches else None,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+def _split_outputs(outputs):
+    # regression has 3 values per hour, classification 7
+    regression = next(o for o in outputs if o.shape[-1] == 3)
+    classification = next(o for o in outputs if o.shape[-1] == 7)
+    return regression, classification
+
+
+class KerasBackend(ModelBackend):
+    name = "keras"
+
+    def _load(self):
+        import tensorflow as tf
+        self.model = tf.keras.models.load_model(self.path)
+
+    def _run(self, X):
+        return self.model.predict(X, verbose=0)
+
+
+class NumpyBackend(ModelBackend):
+    name = "numpy"
+
+    def _load(self):
+        from numpy_lstm import NumpyForecastModel
+        # the .npz is a generated copy of the .keras weights: retraining
+        # does not update it, only `python numpy_lstm.py export` does
+        keras_path = os.path.splitext(self.path)[0] + ".keras"
+        if os.path.exists(keras_path) and os.path.getmtime(keras_path) > os.path.getmtime(self.path):
+            print(f"WARNING: {self.path} is older than {keras_path}, "
+                  f"re-run `python numpy_lstm.py export`")
+        self.model = NumpyForecastModel.load(self.path)
+
+    def _run(self, X):
+        return self.model.predict(X)
+
+
+class OnnxBackend(ModelBackend):
+    name = "onnx"
+
+    def _load(self):
+        import onnxruntime as ort
+        self.session = ort.InferenceSession(
+            self.path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def _run(self, X):
+        return _split_outputs(self.session.run(None, {self.input_name: X}))
+
+
+class TFLiteBackend(ModelBackend):
+    name = "tflite"
+
+    def _load(self):
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            try:
+                from tflite_runtime.interpreter import Interpreter
+            except ImportError:
+                import tensorflow as tf
+                Interpreter = tf.lite.Interpreter
+        self.interpreter = Interpreter(model_path=self.path)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.batch_size = None
+        # the interpreter holds its tensors, one invoke at a time
+        self._lock = threading.Lock()
+
+    def _run(self, X):
+        with self._lock:
+            if self.batch_size != len(X):
+                self.interpreter.resize_tensor_input(
+                    self.input["index"], X.shape)
+                self.interpreter.allocate_tensors()
+                self.batch_size = len(X)
+            self.interpreter.set_tensor(self.input["index"], X)
+            self.interpreter.invoke()
+            outputs = [self.interpreter.get_tensor(o["index"])
+                       for o in self.interpreter.get_output_details()]
+        return _split_outputs(outputs)
+
+
+BACKENDS = {
+    "keras": KerasBackend,
+    "numpy": NumpyBackend,
+    "onnx": OnnxBackend,
+    "tflite": TFLiteBackend,
+}
+
+
+def create_backend(name, path=None):
+    if name not in BACKENDS:
+        raise ValueError(
+            f"unknown model backend: {name} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name](path or DEFAULT_PATHS[name])
+
+
+# ============= CONVERSION (needs tensorflow) =============
+
+def _serving_function(model):
+    import tensorflow as tf
+
+    spec = [tf.TensorSpec((None, PAST_HOURS, FEATURES), tf.float32, name="input")]
+
+    @tf.function(input_signature=spec)
+    def serve(x):
+        regression, classification = model(x, training=False)
+        return {"regression": regression, "classification": classification}
+
+    return serve, spec
+
+
+def convert_to_onnx(keras_path=KERAS_PATH, onnx_path=ONNX_PATH, opset=17):
+    import tensorflow as tf
+    import tf2onnx
+
+    model = tf.keras.models.load_model(keras_path)
+    serve, spec = _serving_function(model)
+    tf2onnx.convert.from_function(
+        serve, input_signature=spec, opset=opset, output_path=onnx_path)
+    print(f"converted {keras_path} -> {onnx_path}")
+    return onnx_path
+
+
+def unrolled_copy(model):
+    """
+    Same model with unroll=True LSTMs: a dynamic-batch LSTM loop converts to
+    TensorList ops that plain TFLite cannot run without the Flex delegate.
+    """
+    import tensorflow as tf
+
+    config = model.get_config()
+    for layer in config["layers"]:
+        if layer["class_name"] == "LSTM":
+            layer["config"]["unroll"] = True
+    clone = tf.keras.Model.from_config(config)
+    clone.set_weights(model.get_weights())
+    return clone
+
+
+def convert_to_tflite(keras_path=KERAS_PATH, tflite_path=TFLITE_PATH):
+    import tensorflow as tf
+
+    model = unrolled_copy(tf.keras.models.load_model(keras_path))
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    with open(tflite_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"converted {keras_path} -> {tflite_path}")
+    return tflite_path
+
+
+def benchmark(name, path=None, batch_sizes=(1, 32, 256), repeats=20):
+    backend = create_backend(name, path).load()
+    rng = np.random.default_rng(0)
+    result = {"load_s": round(backend.load_s, 4), "latency_ms": {}}
+    for batch in batch_sizes:
+        X = rng.normal(size=(batch, PAST_HOURS, FEATURES)).astype(np.float32)
+        backend.predict(X)  # warm-up / allocation for this shape
+        backend.reset_stats()
+        for _ in range(repeats):
+            backend.predict(X)
+        result["latency_ms"][batch] = backend.stats()["mean_batch_ms"]
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+
+    if command == "convert" and len(sys.argv) > 2 and sys.argv[2] in ("onnx", "tflite"):
+        if sys.argv[2] == "onnx":
+            convert_to_onnx()
+        else:
+            convert_to_tflite()
+    elif command == "bench" and len(sys.argv) > 2:
+        print(benchmark(sys.argv[2]))
+    elif command == "bench":
+        # one process per backend so peak RSS is not shared between them
+        import subprocess
+        for name, path in DEFAULT_PATHS.items():
+            if not os.path.exists(path):
+                print(f"{name:>7}: {path} missing, skipped")
+                continue
+            out = subprocess.run([sys.executable, __file__, "bench", name],
+                                 capture_output=True, text=True)
+            lines = out.stdout.strip().splitlines()
+            print(f"{name:>7}: {lines[-1] if lines else out.stderr.strip()[-300:]}")
+    else:
+        print("usage: python backends.py convert [onnx|tflite]")
+        print("       python backends.py bench [keras|numpy|onnx|tflite]")
@@ -0,0 +1,228 @@
+# Historical backtest of the forecast model on the merged dataset.
+#
+# Every hour of the chosen cities / date range becomes a forecast made with
+# the previous 24 hours, exactly like predict_weather does it live (same
+# features, same unscaling and dual anchoring), but vectorized: the windows
+# are numpy views, the features come from prediction.preprocess_arrays and
+# the model runs on large batches. Reports MAE per horizon (anchored model,
+# raw model, persistence) and confusion matrices of decode_weather_smart.
+#
+# usage: python backtest.py [--cities Iasi,Cluj] [--start 2024-01-01] [--end 2024-12-31]
+#                           [--batch 4096] [--out backtest_report.json]
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+import prediction
+from gazetteer import Gazetteer
+from retrieve_data import CITY_NAMES
+
+SOURCE_CSV = "weather_romania_38_cities_2021_2025.csv"
+REPORT_PATH = "backtest_report.json"
+BATCH = 4096
+
+PAST = prediction.PAST_HOURS
+HORIZON = prediction.FUTURE_HORIZON
+CLASSES = ["Clear", "Cloudy", "Fog", "Rain", "Rain (Heavy)", "Snow/Ice", "Thunderstorm"]
+
+
+def wmo_to_condition(codes):
+    """Vectorized build_trainingset.map_wmo_to_condition (keep them in sync)."""
+    codes = np.asarray(codes)
+    out = np.zeros(codes.shape, dtype=np.int64)
+    out[np.isin(codes, [1, 2, 3])] = 1
+    out[(codes >= 40) & (codes <= 49)] = 2
+    out[(codes >= 51) & (codes <= 67)] = 3
+    out[(codes >= 80) & (codes <= 82)] = 4
+    out[((codes >= 71) & (codes <= 77)) | np.isin(codes, [85, 86])] = 5
+    out[(codes >= 95) & (codes <= 99)] = 6
+    return out
+
+
+def load_history(path, city_ids, start, end):
+    """city_id -> DataFrame sorted by time, with PAST hours of context before start."""
+    columns = ["time", "city_id", "weather_code"] + prediction.API_COLS + prediction.STATIC_FEATURES
+    df = pd.read_csv(path, usecols=columns)
+    df["time"] = pd.to_datetime(df["time"])
+    if city_ids is not None:
+        df = df[df["city_id"].isin(city_ids)]
+    if start is not None:
+        df = df[df["time"] >= pd.Timestamp(start) - pd.Timedelta(hours=PAST)]
+    if end is not None:
+        df = df[df["time"] < pd.Timestamp(end) + pd.Timedelta(days=1, hours=HORIZON)]
+    return {city_id: city_df.drop_duplicates("time").sort_values("time").reset_index(drop=True)
+            for city_id, city_df in df.groupby("city_id")}
+
+
+def city_windows(city_df, start, end):
+    """
+    Views of every valid (24h past, 6h future) window of one city:
+    raw (N, 24, 7), times (N, 24), static (N, 3), future targets (N, 6, 4).
+    """
+    raw = city_df[prediction.API_COLS].to_numpy(dtype=np.float64)
+    times = city_df["time"].to_numpy().astype("datetime64[h]")
+    static = city_df[prediction.STATIC_FEATURES].to_numpy(dtype=np.float64)
+    targets = city_df[["temperature_2m", "precipitation", "wind_speed_10m", "weather_code"]].to_numpy(dtype=np.float64)
+
+    span = PAST + HORIZON
+    if len(city_df) < span:
+        return None
+
+    # a window needs 30 consecutive hours and no missing value
+    hours = times.astype(np.int64)
+    consecutive = (hours[span - 1:] - hours[:len(hours) - span + 1]) == span - 1
+    complete = ~sliding_window_view(np.isnan(raw).any(axis=1) | np.isnan(targets).any(axis=1),
+                                    span).any(axis=1)
+    first_future = times[PAST:len(times) - HORIZON + 1]
+    valid = consecutive & complete
+    if start is not None:
+        valid &= first_future >= np.datetime64(start, "h")
+    if end is not None:
+        valid &= first_future < np.datetime64(end, "h") + 24
+    idx = np.flatnonzero(valid)
+
+    return {
+        "raw": sliding_window_view(raw, PAST, axis=0)[idx].transpose(0, 2, 1),
+        "times": sliding_window_view(times, PAST)[idx],
+        "static": static[idx + PAST - 1],
+        "future": sliding_window_view(targets[PAST:], HORIZON, axis=0)[idx].transpose(0, 2, 1),
+    }
+
+
+def forecast(bundle, raw, times, static):
+    """
+    Anchored temp, precip, anchored wind, unanchored temp / wind, class
+    probabilities and last observed temp / wind for a batch of windows.
+    """
+    X, last_temp, last_wind = prediction.preprocess_arrays(raw, times, static, bundle["scaler"])
+    with bundle["predict_lock"]:
+        regression, classification = bundle["model"].predict(X, verbose=0)
+
+    # same unscaling as unscale_prediction, all windows at once
+    temp = bundle["t_scaler"].inverse_transform(regression[:, :, 0].reshape(-1, 1)).reshape(-1, HORIZON)
+    precip = bundle["p_scaler"].inverse_transform(regression[:, :, 1].reshape(-1, 1)).reshape(-1, HORIZON)
+    wind = bundle["w_scaler"].inverse_transform(regression[:, :, 2].reshape(-1, 1)).reshape(-1, HORIZON)
+
+    # same dual anchoring as anchor_forecast (without the display rounding)
+    temp_anchored = temp + ((last_temp - temp[:, 0]) * 0.9)[:, None]
+    wind_anchored = np.maximum(0.0, wind + ((last_wind - wind[:, 0]) * 0.8)[:, None])
+    precip = np.maximum(0.0, precip)
+    return temp_anchored, precip, wind_anchored, temp, wind, classification, last_temp, last_wind
+
+
+class Totals:
+    """Running sums, so memory does not grow with the number of windows."""
+
+    def __init__(self):
+        self.windows = 0
+        self.abs_err = {}
+        self.confusion_smart = np.zeros((len(CLASSES), len(prediction.WEATHER_LABELS)), dtype=np.int64)
+        self.confusion_argmax = np.zeros((len(CLASSES), len(CLASSES)), dtype=np.int64)
+
+    def add_error(self, name, predicted, actual):
+        err = np.abs(predicted - actual).sum(axis=0)
+        self.abs_err[name] = self.abs_err.get(name, 0) + err
+
+    def mae(self, name):
+        return [round(float(v), 3) for v in self.abs_err[name] / self.windows]
+
+
+def run(cities=None, start=None, end=None, batch=BATCH, source=SOURCE_CSV):
+    gazetteer = Gazetteer.from_cities()
+    city_ids = None
+    if cities:
+        city_ids = []
+        for name in cities:
+            entry = gazetteer.resolve(name)
+            if entry is None:
+                raise ValueError(f"unknown city: {name}")
+            city_ids.append(CITY_NAMES.index(entry["name"]))
+
+    bundle = prediction.REGISTRY.get()
+    load_start = time.perf_counter()
+    history = load_history(source, city_ids, start, end)
+    load_s = time.perf_counter() - load_start
+
+    totals = Totals()
+    compute_start = time.perf_counter()
+    for city_id, city_df in history.items():
+        windows = city_windows(city_df, start, end)
+        if windows is None or len(windows["raw"]) == 0:
+            continue
+        for lo in range(0, len(windows["raw"]), batch):
+            part = {key: value[lo:lo + batch] for key, value in windows.items()}
+            temp, precip, wind, temp_raw, wind_raw, probs, last_temp, last_wind = forecast(
+                bundle, part["raw"], part["times"], part["static"])
+            future = part["future"]
+            totals.windows += len(future)
+
+            totals.add_error("temp", temp, future[:, :, 0])
+            totals.add_error("precip", precip, future[:, :, 1])
+            totals.add_error("wind", wind, future[:, :, 2])
+            totals.add_error("temp_unanchored", temp_raw, future[:, :, 0])
+            totals.add_error("wind_unanchored", wind_raw, future[:, :, 2])
+            totals.add_error("temp_persistence", last_temp[:, None], future[:, :, 0])
+            totals.add_error("wind_persistence", last_wind[:, None], future[:, :, 2])
+
+            actual = wmo_to_condition(future[:, :, 3]).ravel()
+            np.add.at(totals.confusion_smart,
+                      (actual, prediction.decode_weather_smart_batch(probs).ravel()), 1)
+            np.add.at(totals.confusion_argmax, (actual, np.argmax(probs, axis=-1).ravel()), 1)
+        print(f"city {city_id} ({CITY_NAMES[city_id]}): {len(windows['raw'])} windows")
+    compute_s = time.perf_counter() - compute_start
+
+    if totals.windows == 0:
+        raise ValueError("no complete 30h window in this selection")
+
+    accuracy = np.trace(totals.confusion_argmax) / totals.confusion_argmax.sum()
+    return {
+        "cities": [CITY_NAMES[c] for c in history],
+        "start": start, "end": end,
+        "windows": totals.windows,
+        "load_s": round(load_s, 2),
+        "compute_s": round(compute_s, 2),
+        "windows_per_s": round(totals.windows / compute_s, 1),
+        "mae_per_horizon": {name: totals.mae(name) for name in totals.abs_err},
+        "class_accuracy_argmax": round(float(accuracy), 4),
+        "classes": CLASSES,
+        "smart_labels": prediction.WEATHER_LABELS,
+        "confusion_argmax": totals.confusion_argmax.tolist(),
+        "confusion_smart": totals.confusion_smart.tolist(),
+    }
+
+
+def print_report(report):
+    print(f"\n--- Backtest: {report['windows']} forecasts, {len(report['cities'])} cities, "
+          f"{report['windows_per_s']:.0f} windows/s ---")
+    print(f"{'MAE':<20}" + "".join(f"{'+' + str(h + 1) + 'h':>8}" for h in range(HORIZON)))
+    for name, values in report["mae_per_horizon"].items():
+        print(f"{name:<20}" + "".join(f"{v:>8.3f}" for v in values))
+
+    print(f"\nargmax accuracy: {report['class_accuracy_argmax']:.3f}")
+    print("\nconfusion (rows: observed, columns: decode_weather_smart)")
+    labels = [label[:9] for label in report["smart_labels"]]
+    print(f"{'':<13}" + "".join(f"{label:>10}" for label in labels))
+    for name, row in zip(report["classes"], report["confusion_smart"]):
+        print(f"{name:<13}" + "".join(f"{v:>10}" for v in row))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vectorized historical backtest")
+    parser.add_argument("--cities", help="comma separated names (default: all)")
+    parser.add_argument("--start", help="first forecast day, YYYY-MM-DD")
+    parser.add_argument("--end", help="last forecast day, YYYY-MM-DD")
+    parser.add_argument("--batch", type=int, default=BATCH)
+    parser.add_argument("--source", default=SOURCE_CSV)
+    parser.add_argument("--out", default=REPORT_PATH)
+    args = parser.parse_args()
+
+    report = run(args.cities.split(",") if args.cities else None,
+                 args.start, args.end, args.batch, args.source)
+    print_report(report)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nsaved {args.out}")
@@ -0,0 +1,184 @@
+# End-to-end latency benchmark of the forecast pipeline, stage by stage:
+# geocode -> fetch -> preprocess -> inference -> unscale -> anchoring.
+#
+# Runs fully offline: the Open-Meteo calls go over HTTP to an in-process
+# meteo_standin.py server (optionally with injected latency). For every
+# batch size the caches are emptied first (cold run), then the same batch is
+# repeated with warm caches. Results are saved as JSON; --compare prints the
+# change against an earlier run so regressions stand out.
+#
+# usage: python bench_pipeline.py [--batches 1,8,64,256] [--repeats 5]
+#                                 [--latency-ms 0] [--out pipeline_bench_report.json]
+#                                 [--compare old_report.json]
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+import http_client
+import meteo_standin
+import prediction
+from geocache import GeoCache
+from grid_index import GridIndex
+from obs_cache import ObservationCache
+from retrieve_data import CITY_NAMES
+
+STAGES = ["geocode", "fetch", "preprocess", "inference", "unscale", "anchoring"]
+REPORT_PATH = "pipeline_bench_report.json"
+REGRESSION = 1.2            # --compare flags stages 20% slower than before
+
+
+def reset_caches():
+    prediction.GEOCACHE = GeoCache(":memory:")
+    prediction.OBS_CACHE = ObservationCache(prediction.PAST_HOURS)
+    prediction.GRID = GridIndex()
+
+
+def run_once(names, bundle):
+    """Seconds per stage for one pass over names (same steps as Predictor)."""
+    times = {}
+
+    start = time.perf_counter()
+    located = [prediction.get_data_city(name) for name in names]
+    times["geocode"] = time.perf_counter() - start
+
+    # more places than cities: spread the repeats over other grid cells
+    locations = []
+    for k, (coords, error) in enumerate(located):
+        if error:
+            raise RuntimeError(f"{names[k]}: {error}")
+        shift = (k // len(CITY_NAMES)) * 0.25
+        locations.append((coords[0] + shift, coords[1] + shift, coords[2]))
+
+    start = time.perf_counter()
+    live = prediction.get_live_data_batch(locations)
+    times["fetch"] = time.perf_counter() - start
+    frames = [df for df, error in live if not error]
+    if len(frames) != len(names):
+        raise RuntimeError(f"{len(names) - len(frames)} windows missing")
+
+    start = time.perf_counter()
+    X, last_raws = prediction.preprocess_batch(
+        [prediction.window_arrays(df) for df in frames], bundle["scaler"])
+    times["preprocess"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with bundle["predict_lock"]:
+        regression, classification = bundle["model"].predict(X, verbose=0)
+    times["inference"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    unscaled = [prediction.unscale_prediction(regression[i], bundle) for i in range(len(X))]
+    times["unscale"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i, (temp, precip, wind) in enumerate(unscaled):
+        prediction.anchor_forecast(temp, precip, wind, classification[i], last_raws[i])
+    times["anchoring"] = time.perf_counter() - start
+
+    return times
+
+
+def _ms(times):
+    ms = {stage: round(times[stage] * 1000, 3) for stage in STAGES}
+    ms["total"] = round(sum(times.values()) * 1000, 3)
+    return ms
+
+
+def benchmark(batch_sizes, repeats):
+    load_start = time.perf_counter()
+    prediction.REGISTRY.get()
+    model_load_s = time.perf_counter() - load_start
+    bundle = prediction.REGISTRY.get()
+
+    results = {}
+    for size in batch_sizes:
+        names = [CITY_NAMES[i % len(CITY_NAMES)] for i in range(size)]
+
+        reset_caches()
+        cold = run_once(names, bundle)
+
+        warm_runs = [run_once(names, bundle) for _ in range(repeats)]
+        warm = {stage: float(np.median([run[stage] for run in warm_runs])) for stage in STAGES}
+
+        results[str(size)] = {"cold_ms": _ms(cold), "warm_ms": _ms(warm)}
+        print(f"batch {size:>4}: cold {results[str(size)]['cold_ms']['total']:>9.1f} ms"
+              f" | warm {results[str(size)]['warm_ms']['total']:>9.1f} ms")
+    return round(model_load_s, 3), results
+
+
+def print_table(results):
+    for mode in ("cold_ms", "warm_ms"):
+        print(f"\n--- {mode[:4]} caches (ms) ---")
+        print(f"{'batch':>6}" + "".join(f"{stage:>12}" for stage in STAGES + ["total"]))
+        for size, run in results.items():
+            print(f"{size:>6}" + "".join(f"{run[mode][stage]:>12.3f}" for stage in STAGES + ["total"]))
+
+
+def compare(results, old_path):
+    with open(old_path) as f:
+        old = json.load(f)["batches"]
+    print(f"\n--- vs {old_path} (new / old) ---")
+    slower = []
+    for size, run in results.items():
+        if size not in old:
+            continue
+        for mode in ("cold_ms", "warm_ms"):
+            ratios = []
+            for stage in STAGES + ["total"]:
+                before = old[size][mode].get(stage)
+                ratio = run[mode][stage] / before if before else float("nan")
+                ratios.append(f"{ratio:>12.2f}")
+                if ratio > REGRESSION and run[mode][stage] > 0.5:
+                    slower.append(f"batch {size} {mode[:4]} {stage}: {ratio:.2f}x")
+            print(f"{size:>6} {mode[:4]}" + "".join(ratios))
+    if slower:
+        print("\nslower than before:\n  " + "\n  ".join(slower))
+    return not slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast pipeline stage benchmark")
+    parser.add_argument("--batches", default="1,8,64,256")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="latency injected by the Open-Meteo stand-in")
+    parser.add_argument("--out", default=REPORT_PATH)
+    parser.add_argument("--compare", help="earlier report to compare against")
+    args = parser.parse_args()
+
+    batch_sizes = [int(b) for b in args.batches.split(",")]
+    standin = meteo_standin.StandIn(
+        port=0, mode="synthesize", faults=meteo_standin.Faults(latency_ms=args.latency_ms))
+    http_client.BASE_URL = standin.start()
+    try:
+        model_load_s, results = benchmark(batch_sizes, args.repeats)
+    finally:
+        standin.stop()
+
+    print_table(results)
+    report = {
+        "created": datetime.utcnow().isoformat(timespec="seconds"),
+        "backend": prediction.REGISTRY.backend,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "standin_latency_ms": args.latency_ms,
+        "repeats": args.repeats,
+        "model_load_s": model_load_s,
+        "batches": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nsaved {args.out}")
+
+    if args.compare:
+        return compare(results, args.compare)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
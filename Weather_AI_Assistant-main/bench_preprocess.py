@@ -0,0 +1,82 @@
+# Microbenchmark and golden check of the NumPy preprocessing fast path.
+#
+# Builds random 24h windows (every hour of the day and day of the year,
+# leap years included), checks that preprocess_fast / preprocess_batch give
+# exactly the same arrays as the pandas preprocess_data, then times both.
+#
+# usage: python bench_preprocess.py [windows]
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from prediction import (API_COLS, PAST_HOURS, SCALER_MAIN, preprocess_batch,
+                        preprocess_data, preprocess_fast, window_arrays)
+
+RANGES = {
+    "temperature_2m": (-25, 40),
+    "relative_humidity_2m": (10, 100),
+    "surface_pressure": (850, 1040),
+    "cloud_cover": (0, 100),
+    "wind_speed_10m": (0, 60),
+    "wind_direction_10m": (0, 360),
+    "precipitation": (0, 12),
+}
+
+
+def random_window(rng):
+    start = pd.Timestamp("2020-01-01") + pd.Timedelta(hours=int(rng.integers(0, 24 * 366 * 5)))
+    df = pd.DataFrame({"time": pd.date_range(start, periods=PAST_HOURS, freq="h")})
+    for col in API_COLS:
+        low, high = RANGES[col]
+        df[col] = np.round(rng.uniform(low, high, PAST_HOURS), 1)
+    df["latitude"] = rng.uniform(43.6, 48.3)
+    df["longitude"] = rng.uniform(20.2, 29.7)
+    df["elevation"] = float(rng.integers(0, 2000))
+    return df
+
+
+def timed(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main(count=2000):
+    scaler = joblib.load(SCALER_MAIN)
+    rng = np.random.default_rng(0)
+    frames = [random_window(rng) for _ in range(count)]
+
+    # golden check, window by window and as one batch
+    mismatches = 0
+    reference = []
+    for df in frames:
+        X_ref, ts_ref, raw_ref = preprocess_data(df.copy(), scaler)
+        X_fast, ts_fast, raw_fast = preprocess_fast(df, scaler)
+        if not (np.array_equal(X_ref, X_fast) and ts_ref == ts_fast and raw_ref == raw_fast):
+            mismatches += 1
+        reference.append(X_ref[0])
+    X_batch, _ = preprocess_batch([window_arrays(df) for df in frames], scaler)
+    batch_ok = np.array_equal(np.stack(reference), X_batch)
+
+    print("\n========== PREPROCESS CHECK ==========")
+    print(f"windows: {count}  single mismatches: {mismatches}  batch identical: {batch_ok}")
+
+    print("\n========== PREPROCESS TIMING (ms) ==========")
+    print(f"{'batch':>6}{'pandas':>10}{'numpy':>10}{'speedup':>9}")
+    for size in (1, 16, 256):
+        batch = frames[:size]
+        repeats = max(3, 200 // size)
+        pandas_ms = timed(lambda: [preprocess_data(df.copy(), scaler) for df in batch], repeats)
+        numpy_ms = timed(lambda: preprocess_batch([window_arrays(df) for df in batch], scaler), repeats)
+        print(f"{size:>6}{pandas_ms:>10.3f}{numpy_ms:>10.3f}{pandas_ms / numpy_ms:>8.1f}x")
+
+    return mismatches == 0 and batch_ok
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    sys.exit(0 if main(count) else 1)
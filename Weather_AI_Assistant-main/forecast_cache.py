@@ -0,0 +1,123 @@
+import asyncio
+import os
+import threading
+import time
+
+from gazetteer import fold
+from prediction import current_hour
+
+# a forecast is fresh for FRESH_S seconds (and only within the UTC hour it
+# was computed in); after that it is still served for STALE_S more seconds
+# while a new one is computed in the background
+FRESH_S = float(os.environ.get("WEATHER_CACHE_FRESH_S", 600))
+STALE_S = float(os.environ.get("WEATHER_CACHE_STALE_S", 3600))
+
+
+class ForecastCache:
+    """
+    Stale-while-revalidate cache of weather_tool results, keyed by folded
+    city name. Concurrent requests for the same city share one computation
+    (single-flight); only successful results are stored.
+    """
+
+    def __init__(self, fresh_s=FRESH_S, stale_s=STALE_S):
+        self.fresh_s = fresh_s
+        self.stale_s = stale_s
+        self._entries = {}       # key -> (result, stored_at, hour)
+        self._inflight = {}      # key -> asyncio.Task computing it
+        self._background = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.revalidations = 0
+        self.errors = 0
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def put(self, city, result):
+        if not result or result.get("status") != "success":
+            return
+        with self._lock:
+            self._entries[fold(city)] = (result, time.monotonic(), current_hour())
+
+    def peek(self, city):
+        """(result, state) with state 'fresh', 'stale' or None (missing/expired)."""
+        with self._lock:
+            entry = self._entries.get(fold(city))
+        if entry is None:
+            return None, None
+        result, stored_at, hour = entry
+        age = time.monotonic() - stored_at
+        if age < self.fresh_s and hour == current_hour():
+            return result, "fresh"
+        if age < self.fresh_s + self.stale_s:
+            return result, "stale"
+        return None, None
+
+    def _compute(self, key, city, compute):
+        """Task computing city, shared by everyone asking meanwhile."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count("coalesced")
+            return task
+
+        async def run():
+            try:
+                result = await compute(city)
+                if result is None or result.get("status") != "success":
+                    self._count("errors")
+                self.put(city, result)
+                return result
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._inflight[key] = task
+        return task
+
+    async def get(self, city, compute):
+        """
+        Cached forecast for city; compute is an async callable(city) used on
+        a miss (awaited) or for a stale entry (in the background).
+        """
+        key = fold(city)
+        result, state = self.peek(city)
+        if state == "fresh":
+            self._count("hits")
+            return dict(result, city_name=city)
+        if state == "stale":
+            self._count("stale")
+            if key not in self._inflight:
+                self._count("revalidations")
+            task = self._compute(key, city, compute)
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            return dict(result, city_name=city)
+
+        self._count("misses")
+        # shield: a cancelled caller must not cancel the others waiting on it
+        result = await asyncio.shield(self._compute(key, city, compute))
+        if result and result.get("status") == "success":
+            return dict(result, city_name=city)
+        return result
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.stale + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale": self.stale,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "revalidations": self.revalidations,
+                "errors": self.errors,
+                "hit_rate": round((self.hits + self.stale) / requests, 3) if requests else None,
+            }
+
+
+FORECAST_CACHE = ForecastCache()
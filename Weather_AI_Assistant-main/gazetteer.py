@@ -0,0 +1,200 @@
+import os
+import unicodedata
+
+GAZETTEER_PATH = "RO.txt"     # GeoNames dump, e.g. https://download.geonames.org/export/dump/RO.zip
+
+# names people (and speech recognition) use for the built-in cities
+ALIASES = {
+    "Bucharest": ["Bucuresti", "București"],
+    "Iasi": ["Iași", "Jassy"],
+    "Cluj-Napoca": ["Cluj"],
+    "Constanta": ["Constanța"],
+    "Brasov": ["Brașov"],
+    "Timisoara": ["Timișoara"],
+}
+
+
+def fold(name):
+    """'  Iași ' -> 'iasi', 'Cluj-Napoca' -> 'cluj napoca'."""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = "".join(ch if ch.isalnum() else " " for ch in text.casefold())
+    return " ".join(text.split())
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance, or limit + 1 as soon as it cannot be <= limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children = {}
+        self.entries = []
+
+
+class Gazetteer:
+    """
+    Offline city index: folded names in a dict (exact), a prefix trie
+    ("cluj" -> "cluj napoca") and bounded edit distance for misspellings.
+    Entries are dicts with name, latitude, longitude, elevation (may be None)
+    and population.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.exact = {}
+        self.by_length = {}     # len(alias) -> aliases, limits the fuzzy scan
+        self.root = _TrieNode()
+
+    def add(self, name, lat, lon, elev=None, population=0, alternate_names=()):
+        entry = {"name": name, "latitude": lat, "longitude": lon,
+                 "elevation": elev, "population": population}
+        self.entries.append(entry)
+        for alias in {fold(n) for n in (name, *alternate_names)}:
+            if not alias:
+                continue
+            if alias not in self.exact:
+                self.by_length.setdefault(len(alias), []).append(alias)
+            self.exact.setdefault(alias, []).append(entry)
+            node = self.root
+            for ch in alias:
+                node = node.children.setdefault(ch, _TrieNode())
+            node.entries.append((alias, entry))
+
+    @staticmethod
+    def _best(entries):
+        """
+        Most populated entry, None when two places tie (ambiguous). Note:
+        from_cities() has no populations (all 0), so there any match on two
+        different cities is ambiguous and the name goes to the geocoder.
+        """
+        unique = list({id(e): e for e in entries}.values())
+        unique.sort(key=lambda e: e["population"] or 0, reverse=True)
+        if len(unique) > 1 and (unique[0]["population"] or 0) == (unique[1]["population"] or 0):
+            return None
+        return unique[0] if unique else None
+
+    def complete(self, prefix, limit=10):
+        """(alias, entry) pairs whose folded name starts with prefix."""
+        return self._subtree(fold(prefix), limit)
+
+    def _subtree(self, key, limit):
+        node = self.root
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        found, stack = [], [node]
+        while stack and len(found) < limit:
+            node = stack.pop()
+            found.extend(node.entries)
+            stack.extend(node.children.values())
+        return found[:limit]
+
+    def resolve(self, query):
+        """Best entry for a (possibly misspelled) city name, or None."""
+        return self.match(query)[0]
+
+    def match(self, query):
+        """
+        (entry, how) for a city name. how is "exact" (same folded name or
+        alias: "Iași", "Bucuresti"), "prefix" ("cluj") or "fuzzy"
+        ("Timisora"); (None, None) when nothing matches.
+        """
+        key = fold(query)
+        if not key:
+            return None, None
+
+        if key in self.exact:
+            return self._best(self.exact[key]), "exact"
+
+        # whole-word prefix only: "cluj" -> "cluj napoca", but "roma" !-> "roman"
+        if len(key) >= 3:
+            candidates = [entry for _, entry in self._subtree(key + " ", 50)]
+            if candidates:
+                return self._best(candidates), "prefix"
+
+        # misspellings: up to 1 edit for short names, 2 for longer ones
+        if len(key) < 5:
+            return None, None
+        limit = 1 if len(key) < 8 else 2
+        best, best_distance = [], limit + 1
+        for length in range(len(key) - limit, len(key) + limit + 1):
+            for alias in self.by_length.get(length, ()):
+                distance = edit_distance(key, alias, limit)
+                if distance < best_distance:
+                    best, best_distance = list(self.exact[alias]), distance
+                elif distance == best_distance and distance <= limit:
+                    best.extend(self.exact[alias])
+        entry = self._best(best)
+        return entry, "fuzzy" if entry is not None else None
+
+    # ============= LOADERS =============
+
+    @classmethod
+    def from_cities(cls):
+        """The 49 cities hard-coded in retrieve_data.CITIES."""
+        from retrieve_data import CITIES, CITY_NAMES
+
+        gazetteer = cls()
+        for name, (lat, lon) in zip(CITY_NAMES, CITIES):
+            gazetteer.add(name, lat, lon, alternate_names=ALIASES.get(name, ()))
+        return gazetteer
+
+    @classmethod
+    def from_geonames(cls, path=GAZETTEER_PATH, min_population=0):
+        """
+        GeoNames tab separated dump (geonameid, name, asciiname,
+        alternatenames, latitude, longitude, feature class, ... population
+        at column 14, elevation 15, dem 16). Only populated places are kept.
+        """
+        gazetteer = cls()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                cols = line.rstrip("\n").split("\t")
+                if len(cols) < 17 or cols[6] != "P":
+                    continue
+                population = int(cols[14] or 0)
+                if population < min_population:
+                    continue
+                elev = cols[15] or cols[16]
+                gazetteer.add(
+                    cols[1], float(cols[4]), float(cols[5]),
+                    elev=float(elev) if elev not in ("", "-9999") else None,
+                    population=population,
+                    alternate_names=[cols[2]] + [n for n in cols[3].split(",") if n],
+                )
+        return gazetteer
+
+    @classmethod
+    def load(cls, path=GAZETTEER_PATH):
+        if os.path.exists(path):
+            return cls.from_geonames(path)
+        return cls.from_cities()
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    gazetteer = Gazetteer.load()
+    print(f"{len(gazetteer.entries)} places loaded")
+    for query in sys.argv[1:] or ["Iași", "cluj", "Timisora", "Bucuresti", "Paris"]:
+        start = time.perf_counter()
+        entry = gazetteer.resolve(query)
+        elapsed = (time.perf_counter() - start) * 1e6
+        print(f"{query!r:>14} -> {entry['name'] if entry else None} ({elapsed:.0f} us)")
@@ -0,0 +1,154 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import http_client
+from gazetteer import fold
+
+GEOCACHE_PATH = "geocache.sqlite"
+TTL_SECONDS = 30 * 24 * 3600          # city coordinates practically never change
+NEGATIVE_TTL_SECONDS = 24 * 3600      # "no result" is retried after a day
+MEMORY_SIZE = 256
+
+ELEVATION_URL = "https://api.open-meteo.com/v1/elevation"
+
+
+def normalize_city(name):
+    # "  Cluj-Napoca " -> "cluj napoca", "Iași" -> "iasi" (same as the gazetteer)
+    return fold(name)
+
+
+class GeoCache:
+    """
+    Geocoding cache: LRU dict in memory in front of a SQLite table on disk.
+    A row with NULL coordinates is a cached "no result".
+    """
+
+    def __init__(self, path=GEOCACHE_PATH, ttl=TTL_SECONDS,
+                 negative_ttl=NEGATIVE_TTL_SECONDS, memory_size=MEMORY_SIZE):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0,
+                         "negative_hits": 0, "misses": 0}
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS geocode (
+                name TEXT PRIMARY KEY,
+                latitude REAL,
+                longitude REAL,
+                elevation REAL,
+                stored_at REAL NOT NULL
+            )""")
+        self._db.commit()
+
+    def _expired(self, coords, stored_at):
+        ttl = self.ttl if coords is not None else self.negative_ttl
+        return time.time() - stored_at > ttl
+
+    def _remember(self, key, coords, stored_at):
+        self._memory[key] = (coords, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def lookup(self, city):
+        """
+        Return (found, coords). coords is (lat, lon, elev) or None for a
+        cached "no result". found is False when the network must be asked.
+        """
+        key = normalize_city(city)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(*entry):
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                if entry[0] is None:
+                    self.counters["negative_hits"] += 1
+                return True, entry[0]
+
+            row = self._db.execute(
+                "SELECT latitude, longitude, elevation, stored_at FROM geocode WHERE name = ?",
+                (key,)).fetchone()
+            if row is not None:
+                lat, lon, elev, stored_at = row
+                coords = None if lat is None else (lat, lon, elev)
+                if not self._expired(coords, stored_at):
+                    self._remember(key, coords, stored_at)
+                    self.counters["disk_hits"] += 1
+                    if coords is None:
+                        self.counters["negative_hits"] += 1
+                    return True, coords
+
+            self.counters["misses"] += 1
+            return False, None
+
+    def put(self, city, coords):
+        """Store (lat, lon, elev), or None to remember that nothing was found."""
+        self.put_many([(city, coords)])
+
+    def put_many(self, entries):
+        now = time.time()
+        rows = []
+        with self._lock:
+            for city, coords in entries:
+                key = normalize_city(city)
+                lat, lon, elev = coords if coords is not None else (None, None, None)
+                rows.append((key, lat, lon, elev, now))
+                self._remember(key, coords, now)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = self._db.execute(
+                "SELECT COUNT(*) FROM geocode").fetchone()[0]
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        total = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / total, 3) if total else None
+        return stats
+
+
+def seed_from_retrieve_data(cache):
+    """
+    Pre-seed the cache with the cities hard-coded in retrieve_data.CITIES.
+    Elevations are not stored there, so they are fetched in ONE request.
+    """
+    from retrieve_data import CITIES, CITY_NAMES
+
+    params = {
+        "latitude": ",".join(str(lat) for lat, _ in CITIES),
+        "longitude": ",".join(str(lon) for _, lon in CITIES),
+    }
+    try:
+        elevations = http_client.get_json(ELEVATION_URL, params=params)["elevation"]
+    except Exception as e:
+        print(f"cannot get elevations for seeding: {e}")
+        return 0
+
+    entries = [(name, (lat, lon, elev))
+               for name, (lat, lon), elev in zip(CITY_NAMES, CITIES, elevations)]
+    cache.put_many(entries)
+    return len(entries)
+
+
+if __name__ == "__main__":
+    import sys
+
+    cache = GeoCache()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+
+    if command == "seed":
+        count = seed_from_retrieve_data(cache)
+        print(f"seeded {count} cities into {GEOCACHE_PATH}")
+    elif command == "stats":
+        print(cache.stats())
+    else:
+        print("usage: python geocache.py [seed|stats]")
@@ -0,0 +1,63 @@
+import threading
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# ICON-EU (what Open-Meteo's best_match serves over Romania) is a 0.0625° grid
+GRID_RESOLUTION = 0.0625
+
+
+class GridIndex:
+    """
+    Maps coordinates to the weather-model grid cell they fall into.
+
+    Open-Meteo answers every request with the center of the grid cell it
+    used; those centers are registered here and kept in a KD-tree. A point
+    within half a cell of a known center belongs to that cell, otherwise the
+    point is snapped to the regular grid until a response tells the real
+    center. Places sharing a cell can share one fetch and one inference.
+    """
+
+    def __init__(self, resolution=GRID_RESOLUTION):
+        self.resolution = resolution
+        self._centers = []
+        self._known = set()
+        self._aliases = {}      # snapped point -> center the API answered with
+        self._tree = None
+        self._lock = threading.Lock()
+
+    def _snap(self, value):
+        return round(round(value / self.resolution) * self.resolution, 4)
+
+    def cell(self, lat, lon):
+        """(lat, lon) of the grid cell center for this point."""
+        with self._lock:
+            if self._centers and self._tree is None:
+                self._tree = cKDTree(np.array(self._centers))
+            if self._tree is not None:
+                # chebyshev distance: inside the cell's square
+                distance, idx = self._tree.query(
+                    (lat, lon), p=np.inf,
+                    distance_upper_bound=self.resolution / 2)
+                if np.isfinite(distance):
+                    return self._centers[idx]
+            snapped = (self._snap(lat), self._snap(lon))
+            return self._aliases.get(snapped, snapped)
+
+    def register(self, lat, lon, points=()):
+        """
+        Remember a cell center reported by the API, and that the requested
+        points belong to it (in case the model grid is coarser than ours).
+        """
+        center = (round(float(lat), 4), round(float(lon), 4))
+        with self._lock:
+            if center not in self._known:
+                self._known.add(center)
+                self._centers.append(center)
+                self._tree = None    # rebuilt on next lookup
+            for point_lat, point_lon in points:
+                self._aliases[(self._snap(point_lat), self._snap(point_lon))] = center
+        return center
+
+    def __len__(self):
+        return len(self._centers)
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import random
+import threading
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# shared by every Open-Meteo call (geocoding, forecast, historical)
+POOL_SIZE = 20               # keep-alive connections kept per host
+MAX_PER_HOST = 8             # requests in flight per host
+TIMEOUT = (5, 30)            # (connect, read) seconds
+RETRIES = 3
+BACKOFF = 0.5                # seconds, doubled on every retry
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# e.g. http://127.0.0.1:8090 sends every Open-Meteo call (geocoding,
+# forecast, historical, elevation) to the local stand-in meteo_standin.py.
+# Read on every call, so it can also be set at runtime.
+BASE_URL = os.environ.get("OPEN_METEO_BASE_URL")
+
+
+def api_url(url):
+    """url, or the same path on BASE_URL when a stand-in is configured."""
+    if not BASE_URL:
+        return url
+    return BASE_URL.rstrip("/") + urlsplit(url).path
+
+
+# ============= SYNC (requests) =============
+
+def _make_session():
+    retry = Retry(
+        total=RETRIES,
+        backoff_factor=BACKOFF,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE,
+                          pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+SESSION = _make_session()
+
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+
+
+def _host_limit(url):
+    host = urlsplit(url).netloc
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(MAX_PER_HOST)
+        return _host_limits[host]
+
+
+def get_json(url, params=None, timeout=TIMEOUT):
+    """GET on the pooled keep-alive session, retried on 429/5xx."""
+    url = api_url(url)
+    with _host_limit(url):
+        response = SESSION.get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+# ============= ASYNC (httpx) =============
+
+class AsyncHTTP:
+    """
+    One httpx.AsyncClient per event loop with pooled keep-alive
+    connections, a concurrency limit per host, timeouts and retries.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._loop = None
+        self._limits = {}
+
+    async def _get_client(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # clients (and semaphores) are bound to the loop that created them
+            old_client, old_loop = self._client, self._loop
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=POOL_SIZE,
+                                    max_keepalive_connections=POOL_SIZE),
+                timeout=httpx.Timeout(TIMEOUT[1], connect=TIMEOUT[0]),
+            )
+            self._loop = loop
+            self._limits = {}
+            if old_client is not None:
+                await self._close_stale(old_client, old_loop)
+        return self._client
+
+    @staticmethod
+    async def _close_stale(client, loop):
+        """Close the client left by a previous loop (its pooled sockets stay open otherwise)."""
+        if loop.is_running():
+            # still running in another thread: close it there
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        try:
+            await client.aclose()
+        except RuntimeError as e:
+            # the old loop is already closed: its sockets can no longer be
+            # shut down, which is why callers should aclose() before it ends
+            print(f"Could not close the previous HTTP client: {e}")
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._limits:
+            self._limits[host] = asyncio.Semaphore(MAX_PER_HOST)
+        return self._limits[host]
+
+    async def get_json(self, url, params=None):
+        url = api_url(url)
+        client = await self._get_client()
+        delay = BACKOFF
+        for attempt in range(RETRIES + 1):
+            last_try = attempt == RETRIES
+            try:
+                async with self._host_limit(url):
+                    response = await client.get(url, params=params)
+                if response.status_code in RETRY_STATUS and not last_try:
+                    retry_after = response.headers.get("Retry-After", "")
+                    wait = float(retry_after) if retry_after.isdigit() else delay
+                    await asyncio.sleep(wait)
+                    delay *= 2
+                    continue
+                response.raise_for_status()
+                return response.json()
+            except (httpx.TimeoutException, httpx.TransportError):
+                if last_try:
+                    raise
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+                delay *= 2
+
+    async def aclose(self):
+        """Close the pool; await it before the loop that used it ends."""
+        if self._client is not None:
+            client, loop, self._client = self._client, self._loop, None
+            if loop is asyncio.get_running_loop():
+                await client.aclose()
+            else:
+                await self._close_stale(client, loop)
+
+
+ASYNC_HTTP = AsyncHTTP()
+
+
+async def get_json_async(url, params=None):
+    return await ASYNC_HTTP.get_json(url, params=params)
@@ -0,0 +1,186 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# how long the first request of a batch waits for others, and the batch cap
+MAX_WAIT_MS = float(os.environ.get("WEATHER_BATCH_WAIT_MS", 5))
+MAX_BATCH = int(os.environ.get("WEATHER_BATCH_MAX", 64))
+
+REPORT_PATH = "inference_queue_report.json"
+
+
+class InferenceQueue:
+    """
+    Micro-batching in front of the model. Requests (a bundle from the model
+    registry and a (n, 24, 16) window batch) are collected by one worker
+    thread for up to max_wait_ms or max_batch windows, run as a single
+    predict() and each request's Future gets its own rows back.
+    """
+
+    def __init__(self, max_wait_ms=MAX_WAIT_MS, max_batch=MAX_BATCH):
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.requests = 0
+        self.batches = 0
+        self.windows = 0
+        self.largest_batch = 0
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._worker, name="inference-queue", daemon=True)
+                self._thread.start()
+
+    def submit(self, bundle, X):
+        """Future resolving to [regression (n, 6, 3), classification (n, 6, 7)]."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((bundle, np.asarray(X, dtype=np.float32), future))
+        return future
+
+    def predict(self, bundle, X):
+        return self.submit(bundle, X).result()
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        rows = len(pending[0][1])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            pending.append(item)
+            rows += len(item[1])
+        return pending
+
+    def _worker(self):
+        while True:
+            pending = self._collect()
+            # a model reload between two requests -> one batch per bundle
+            groups = {}
+            for item in pending:
+                groups.setdefault(id(item[0]), []).append(item)
+            for items in groups.values():
+                self._run(items)
+
+    def _run(self, items):
+        bundle = items[0][0]
+        X = np.concatenate([X for _, X, _ in items])
+        try:
+            with bundle["predict_lock"]:
+                regression, classification = bundle["model"].predict(X, verbose=0)
+        except Exception as e:
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self.requests += len(items)
+            self.batches += 1
+            self.windows += len(X)
+            self.largest_batch = max(self.largest_batch, len(X))
+
+        start = 0
+        for _, X_item, future in items:
+            end = start + len(X_item)
+            future.set_result([regression[start:end], classification[start:end]])
+            start = end
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_wait_ms": self.max_wait * 1000,
+                "max_batch": self.max_batch,
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch": round(self.windows / self.batches, 2) if self.batches else None,
+                "largest_batch": self.largest_batch,
+            }
+
+
+# ============= SYNTHETIC LOAD =============
+
+def _load(run_one, windows, clients):
+    """clients threads, each sending its share of windows one after the other."""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(rows):
+        for X in rows:
+            start = time.perf_counter()
+            run_one(X)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(windows[i::clients],))
+               for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        "throughput_rps": round(len(windows) / total, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+    }
+
+
+def load_report(requests=2000, clients=(1, 8, 32), out_path=REPORT_PATH):
+    import json
+
+    from prediction import REGISTRY
+
+    bundle = REGISTRY.get()
+    rng = np.random.default_rng(0)
+    windows = [rng.normal(size=(1, 24, 16)).astype(np.float32) for _ in range(requests)]
+
+    def direct(X):
+        with bundle["predict_lock"]:
+            return bundle["model"].predict(X, verbose=0)
+
+    batcher = InferenceQueue()
+    report = {"backend": REGISTRY.backend, "requests": requests, "runs": {}}
+    for n in clients:
+        batcher.reset_stats()
+        report["runs"][n] = {
+            "direct": _load(direct, windows, n),
+            "queued": _load(lambda X: batcher.predict(bundle, X), windows, n),
+            "queue": batcher.stats(),
+        }
+
+    print(f"\n--- Inference queue under load ({requests} requests, {REGISTRY.backend}) ---")
+    print(f"{'clients':>8}{'mode':>8}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'batch':>7}")
+    for n, run in report["runs"].items():
+        for mode in ("direct", "queued"):
+            m = run[mode]
+            batch = run["queue"]["mean_batch"] if mode == "queued" else 1
+            print(f"{n:>8}{mode:>8}{m['throughput_rps']:>10.1f}{m['p50_ms']:>9.2f}{m['p99_ms']:>9.2f}{batch:>7}")
+
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"saved {out_path}")
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    load_report(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
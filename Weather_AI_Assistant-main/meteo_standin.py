@@ -0,0 +1,438 @@
+# Local stand-in for the Open-Meteo APIs used by this project:
+#   /v1/search     geocoding-api.open-meteo.com
+#   /v1/forecast   api.open-meteo.com (and historical-forecast-api when the
+#                  request has start_date / end_date, like retrieve_data.py)
+#   /v1/elevation  api.open-meteo.com
+#
+# Answers come from recordings (standin_recordings/*.json, made with
+# --mode record against the real APIs) or are synthesized from the
+# weather_ro_city_*.csv files of retrieve_data.py (nearest city, the same
+# day of the year when the date is outside the downloaded years). Without
+# the CSVs a deterministic synthetic signal is used, so it always works
+# offline. Latency, 429s, 500s and timeouts can be injected.
+#
+# usage: python meteo_standin.py [--port 8090] [--mode hybrid] [--latency-ms 50] ...
+#        OPEN_METEO_BASE_URL=http://127.0.0.1:8090 python prediction.py Iasi
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+RECORDINGS_DIR = "standin_recordings"
+CSV_PATTERN = "weather_ro_city_{}.csv"
+GRID_RESOLUTION = 0.0625
+MODES = ("hybrid", "replay", "synthesize", "record")
+
+UPSTREAM = {
+    "/v1/search": "https://geocoding-api.open-meteo.com",
+    "/v1/forecast": "https://api.open-meteo.com",
+    "/v1/elevation": "https://api.open-meteo.com",
+}
+HISTORICAL_UPSTREAM = "https://historical-forecast-api.open-meteo.com"
+
+YEAR_HOURS = 364 * 24        # 52 weeks, used to move a date into the CSV range
+
+
+# ============= RECORDINGS =============
+
+def request_key(path, params):
+    query = "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+    return hashlib.sha1(f"{path}?{query}".encode()).hexdigest()
+
+
+class Recordings:
+    def __init__(self, directory=RECORDINGS_DIR):
+        self.directory = directory
+
+    def _path(self, path, params):
+        return os.path.join(self.directory, request_key(path, params) + ".json")
+
+    def get(self, path, params):
+        """(status, body) or None."""
+        file = self._path(path, params)
+        if not os.path.exists(file):
+            return None
+        with open(file, encoding="utf-8") as f:
+            saved = json.load(f)
+        return saved["status"], saved["body"]
+
+    def put(self, path, params, status, body):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(path, params), "w", encoding="utf-8") as f:
+            json.dump({"path": path, "params": params,
+                       "status": status, "body": body}, f)
+
+
+def fetch_upstream(path, params):
+    import requests
+
+    base = UPSTREAM[path]
+    if path == "/v1/forecast" and "start_date" in params:
+        base = HISTORICAL_UPSTREAM
+    response = requests.get(base + path, params=params, timeout=(10, 180))
+    return response.status_code, response.json()
+
+
+# ============= SYNTHESIS =============
+
+class CityData:
+    """Hourly history of the 49 cities of retrieve_data.py, read lazily."""
+
+    def __init__(self, csv_pattern=CSV_PATTERN):
+        from gazetteer import Gazetteer
+        from retrieve_data import CITIES, CITY_NAMES
+
+        self.csv_pattern = csv_pattern
+        self.cities = np.array(CITIES, dtype=np.float64)
+        self.names = CITY_NAMES
+        self.gazetteer = Gazetteer.from_cities()
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def frame(self, idx):
+        with self._lock:
+            if idx not in self._frames:
+                path = self.csv_pattern.format(idx)
+                df = None
+                if os.path.exists(path):
+                    df = pd.read_csv(path)
+                    df["time"] = pd.to_datetime(df["time"])
+                    df = df.drop_duplicates("time").set_index("time").sort_index()
+                self._frames[idx] = df
+            return self._frames[idx]
+
+    def nearest(self, lat, lon):
+        distance = (self.cities[:, 0] - lat) ** 2 + (self.cities[:, 1] - lon) ** 2
+        return int(np.argmin(distance))
+
+    def elevation(self, idx):
+        df = self.frame(idx)
+        if df is not None and "elevation" in df and df["elevation"].notna().any():
+            return float(df["elevation"].dropna().iloc[0])
+        return float(50 + (idx * 37) % 600)
+
+    def hourly(self, idx, times, variables):
+        df = self.frame(idx)
+        if df is None:
+            return _synthetic(idx, times, variables)
+
+        # dates outside the downloaded years -> whole 52-week shifts
+        hours = times.astype("datetime64[h]").astype(np.int64)
+        first = np.datetime64(df.index[0], "h").astype(np.int64)
+        last = np.datetime64(df.index[-1], "h").astype(np.int64)
+        hours = np.where(hours > last, hours - np.ceil((hours - last) / YEAR_HOURS) * YEAR_HOURS, hours)
+        hours = np.where(hours < first, hours + np.ceil((first - hours) / YEAR_HOURS) * YEAR_HOURS, hours)
+        source = pd.DatetimeIndex(hours.astype("datetime64[h]"))
+        rows = df.reindex(source, method="nearest")
+
+        out = {}
+        for var in variables:
+            if var in rows:
+                out[var] = [None if pd.isna(v) else v.item() for v in rows[var].to_numpy()]
+            else:
+                out[var] = _synthetic(idx, times, [var])[var]
+        return out
+
+
+def _synthetic(idx, times, variables):
+    """Smooth deterministic weather: daily and yearly cycles, city offsets."""
+    hours = times.astype("datetime64[h]").astype(np.int64).astype(np.float64)
+    day = 2 * np.pi * hours / 24
+    year = 2 * np.pi * hours / (24 * 365.25)
+    phase = idx * 0.7
+    temp = 11 - 12 * np.cos(year) + 5 * np.sin(day - 2.0) + 2 * np.sin(hours / 37 + phase)
+    cloud = np.clip(50 + 45 * np.sin(hours / 29 + phase), 0, 100)
+    precip = np.clip(np.sin(hours / 13 + phase) - 0.6, 0, None) * 3 * (cloud > 70)
+    columns = {
+        "temperature_2m": temp,
+        "relative_humidity_2m": np.clip(70 - 20 * np.sin(day - 2.0) + 10 * np.sin(hours / 41), 10, 100),
+        "dew_point_2m": temp - 6,
+        "surface_pressure": 1005 + 8 * np.sin(hours / 53 + phase) - idx % 7 * 10,
+        "wind_speed_10m": np.abs(10 + 6 * np.sin(hours / 17 + phase)),
+        "wind_direction_10m": (180 + 170 * np.sin(hours / 61 + phase)) % 360,
+        "precipitation": precip,
+        "cloud_cover": cloud,
+        "weather_code": np.where(precip > 0, 61, np.where(cloud > 80, 3, np.where(cloud > 40, 2, 0))),
+    }
+    out = {}
+    for var in variables:
+        values = columns.get(var, np.zeros(len(hours)))
+        decimals = 0 if var in ("relative_humidity_2m", "wind_direction_10m", "cloud_cover", "weather_code") else 1
+        out[var] = np.round(values, decimals).astype(int if decimals == 0 else float).tolist()
+    return out
+
+
+def _time_range(params, now):
+    """Hourly timestamps asked for, following the Open-Meteo parameters."""
+    if "start_hour" in params:
+        start = datetime.fromisoformat(params["start_hour"])
+        end = datetime.fromisoformat(params["end_hour"])
+    elif "start_date" in params:
+        start = datetime.fromisoformat(params["start_date"])
+        end = datetime.fromisoformat(params["end_date"]) + timedelta(hours=23)
+    else:
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        start = today - timedelta(days=int(params.get("past_days", 0)))
+        end = today + timedelta(days=int(params.get("forecast_days", 7))) - timedelta(hours=1)
+    return np.arange(np.datetime64(start, "h"), np.datetime64(end, "h") + 1)
+
+
+def _grid_point(value):
+    return round(round(value / GRID_RESOLUTION) * GRID_RESOLUTION, 4)
+
+
+class Synthesizer:
+    def __init__(self, data=None):
+        self._data = data
+        self._lock = threading.Lock()
+
+    @property
+    def data(self):
+        with self._lock:
+            if self._data is None:
+                self._data = CityData()
+            return self._data
+
+    def search(self, params):
+        entry = self.data.gazetteer.resolve(params.get("name", ""))
+        body = {"generationtime_ms": 0.1}
+        if entry is not None:
+            idx = self.data.names.index(entry["name"])
+            body["results"] = [{
+                "id": idx + 1, "name": entry["name"],
+                "latitude": entry["latitude"], "longitude": entry["longitude"],
+                "elevation": self.data.elevation(idx),
+                "country_code": "RO", "country": "Romania", "timezone": "Europe/Bucharest",
+            }]
+        return 200, body
+
+    def elevation(self, params):
+        lats = [float(v) for v in str(params["latitude"]).split(",")]
+        lons = [float(v) for v in str(params["longitude"]).split(",")]
+        return 200, {"elevation": [self.data.elevation(self.data.nearest(a, b))
+                                   for a, b in zip(lats, lons)]}
+
+    def forecast(self, params, now=None):
+        lats = [float(v) for v in str(params["latitude"]).split(",")]
+        lons = [float(v) for v in str(params["longitude"]).split(",")]
+        variables = [v for v in params.get("hourly", "").split(",") if v]
+        times = _time_range(params, now or datetime.utcnow())
+        labels = [str(t) for t in times.astype("datetime64[m]")]
+
+        items = []
+        for lat, lon in zip(lats, lons):
+            idx = self.data.nearest(lat, lon)
+            hourly = {"time": labels}
+            hourly.update(self.data.hourly(idx, times, variables))
+            items.append({
+                "latitude": _grid_point(lat), "longitude": _grid_point(lon),
+                "generationtime_ms": 0.1, "utc_offset_seconds": 0,
+                "timezone": "UTC", "timezone_abbreviation": "UTC",
+                "elevation": self.data.elevation(idx),
+                "hourly": hourly,
+            })
+        return 200, items[0] if len(items) == 1 else items
+
+    def answer(self, path, params):
+        handlers = {"/v1/search": self.search, "/v1/forecast": self.forecast,
+                    "/v1/elevation": self.elevation}
+        if path not in handlers:
+            return 404, {"error": True, "reason": f"unknown endpoint {path}"}
+        try:
+            return handlers[path](params)
+        except (KeyError, ValueError) as e:
+            return 400, {"error": True, "reason": f"bad parameter: {e}"}
+
+
+# ============= FAULTS =============
+
+class Faults:
+    """Random latency and errors, reproducible with seed."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, rate_429=0.0, rate_500=0.0,
+                 rate_timeout=0.0, hang_s=60, retry_after=1, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.rate_timeout = rate_timeout
+        self.hang_s = hang_s
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """(delay seconds, fault) with fault None, '429', '500' or 'timeout'."""
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self._random.uniform(-1, 1) * self.jitter_ms) / 1000
+            roll = self._random.random()
+        if roll < self.rate_timeout:
+            return delay, "timeout"
+        roll -= self.rate_timeout
+        if roll < self.rate_429:
+            return delay, "429"
+        roll -= self.rate_429
+        if roll < self.rate_500:
+            return delay, "500"
+        return delay, None
+
+
+# ============= SERVER =============
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are two writes: without this, keep-alive clients
+    # wait ~40 ms on every answer (Nagle + delayed ACK)
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=()):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        standin = self.server.standin
+        url = urlsplit(self.path)
+        if url.path == "/stats":
+            return self._send(200, standin.stats())
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+
+        delay, fault = standin.faults.draw()
+        if delay:
+            time.sleep(delay)
+        standin.count(url.path, fault)
+        if fault == "timeout":
+            # never answer: the client read timeout fires
+            time.sleep(standin.faults.hang_s)
+            self.close_connection = True
+            return
+        if fault == "429":
+            return self._send(429, {"error": True, "reason": "Too many concurrent requests"},
+                              [("Retry-After", str(standin.faults.retry_after))])
+        if fault == "500":
+            return self._send(500, {"error": True, "reason": "injected failure"})
+
+        status, body = standin.answer(url.path, params)
+        self._send(status, body)
+
+
+class StandIn:
+    """
+    The stand-in server. start() serves in a daemon thread and returns the
+    base URL to put in OPEN_METEO_BASE_URL (or http_client.BASE_URL).
+    """
+
+    def __init__(self, host="127.0.0.1", port=8090, mode="hybrid",
+                 recordings=RECORDINGS_DIR, faults=None, synthesizer=None):
+        if mode not in MODES:
+            raise ValueError(f"unknown mode: {mode} (choose from {', '.join(MODES)})")
+        self.host = host
+        self.port = port
+        self.mode = mode
+        self.recordings = Recordings(recordings)
+        self.synthesizer = synthesizer or Synthesizer()
+        self.faults = faults or Faults()
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def count(self, name, fault=None):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            if fault:
+                self.counts[f"injected_{fault}"] = self.counts.get(f"injected_{fault}", 0) + 1
+
+    def answer(self, path, params):
+        if self.mode in ("hybrid", "replay"):
+            saved = self.recordings.get(path, params)
+            if saved is not None:
+                self.count("replayed")
+                return saved
+            if self.mode == "replay":
+                self.count("not_recorded")
+                return 404, {"error": True, "reason": "no recording for this request"}
+        if self.mode == "record":
+            status, body = fetch_upstream(path, params)
+            self.recordings.put(path, params, status, body)
+            self.count("recorded")
+            return status, body
+        self.count("synthesized")
+        return self.synthesizer.answer(path, params)
+
+    def stats(self):
+        with self._lock:
+            return {"mode": self.mode, **self.counts}
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.standin = self
+        self.port = self._server.server_address[1]     # port=0 -> a free one
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local Open-Meteo stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--mode", choices=MODES, default="hybrid",
+                        help="hybrid: recordings, else synthesized (default)")
+    parser.add_argument("--recordings", default=RECORDINGS_DIR)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--rate-429", type=float, default=0)
+    parser.add_argument("--rate-500", type=float, default=0)
+    parser.add_argument("--rate-timeout", type=float, default=0)
+    parser.add_argument("--hang-s", type=float, default=60,
+                        help="how long a 'timeout' request stays unanswered")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    faults = Faults(args.latency_ms, args.jitter_ms, args.rate_429, args.rate_500,
+                    args.rate_timeout, args.hang_s, seed=args.seed)
+    standin = StandIn(args.host, args.port, args.mode, args.recordings, faults)
+    print(f"Open-Meteo stand-in ({args.mode}) on {standin.start()}")
+    print(f"use it with OPEN_METEO_BASE_URL={standin.url}   (stats: {standin.url}/stats)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        standin.stop()
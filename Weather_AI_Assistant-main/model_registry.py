@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+
+import numpy as np
+import joblib
+
+from backends import create_backend
+
+PAST_HOURS = 24
+FEATURES = 16
+
+
+class ModelRegistry:
+    """
+    Process-wide holder for the LSTM and the four scalers.
+    Files are loaded once, the graph is warmed with a dummy input and
+    everything is reloaded when one of the files changes on disk.
+    """
+
+    def __init__(self, model_path, scaler_main, scaler_temp, scaler_precip,
+                 scaler_wind, backend="keras"):
+        # any name from backends.BACKENDS: keras, numpy, onnx, tflite
+        self.backend = backend
+        self.paths = {
+            "model": model_path,
+            "scaler": scaler_main,
+            "t_scaler": scaler_temp,
+            "p_scaler": scaler_precip,
+            "w_scaler": scaler_wind,
+        }
+        self._lock = threading.Lock()
+        self._mtimes = None
+        self._bundle = None
+        self.timings = {
+            "load_s": None,
+            "warmup_s": None,
+            "loads": 0,
+            "last_loaded": None,
+        }
+
+    def _current_mtimes(self):
+        return {key: os.path.getmtime(path) for key, path in self.paths.items()}
+
+    def _load(self):
+        start = time.perf_counter()
+        bundle = {
+            "model": create_backend(self.backend, self.paths["model"]).load(),
+            "scaler": joblib.load(self.paths["scaler"]),
+            "t_scaler": joblib.load(self.paths["t_scaler"]),
+            "p_scaler": joblib.load(self.paths["p_scaler"]),
+            "w_scaler": joblib.load(self.paths["w_scaler"]),
+            # one model call at a time, shared by every thread using this bundle
+            "predict_lock": threading.Lock(),
+        }
+        load_s = time.perf_counter() - start
+
+        # first predict call builds the graph, pay it here and not on a user query
+        start = time.perf_counter()
+        dummy = np.zeros((1, PAST_HOURS, FEATURES), dtype=np.float32)
+        bundle["model"].predict(dummy, verbose=0)
+        warmup_s = time.perf_counter() - start
+        bundle["model"].reset_stats()
+
+        self.timings["load_s"] = round(load_s, 4)
+        self.timings["warmup_s"] = round(warmup_s, 4)
+        self.timings["loads"] += 1
+        self.timings["last_loaded"] = time.time()
+        print(
+            f"model registry ({self.backend}): loaded in {load_s:.2f}s, warm-up {warmup_s:.2f}s")
+        return bundle
+
+    def get(self):
+        """Return the loaded bundle, (re)loading it if files changed on disk."""
+        with self._lock:
+            mtimes = self._current_mtimes()
+            if self._bundle is None or mtimes != self._mtimes:
+                if self._bundle is None:
+                    self._bundle = self._load()
+                else:
+                    print("model registry: files changed on disk, reloading...")
+                    try:
+                        self._bundle = self._load()
+                    except Exception as e:
+                        # file may still be half written, keep serving the old one
+                        print(f"model registry: reload failed, keeping old model: {e}")
+                        return self._bundle
+                self._mtimes = mtimes
+            return self._bundle
+
+    def stats(self):
+        stats = dict(self.timings)
+        if self._bundle is not None:
+            # load time, per-batch latency and peak RSS of the serving backend
+            stats["backend"] = self._bundle["model"].stats()
+        return stats
@@ -0,0 +1,160 @@
+import numpy as np
+
+KERAS_PATH = "weather_lstm_6h_prediction.keras"
+NPZ_PATH = "weather_lstm_6h_prediction.npz"
+
+PAST_HOURS = 24
+FEATURES = 16
+
+
+# ============= EXPORT (needs tensorflow) =============
+
+def export_weights(keras_path=KERAS_PATH, npz_path=NPZ_PATH):
+    """
+    Dump the encoder-decoder built in training.py to a compact .npz:
+    LSTM(128) -> RepeatVector(6) -> LSTM(64) -> TimeDistributed Dense heads.
+    Only that model: the distilled students (GRU / conv) are served by the
+    keras, onnx and tflite backends.
+    """
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(keras_path)
+
+    layer_names = {layer.name for layer in model.layers}
+    if "classification_logits" in layer_names:
+        raise ValueError(f"{keras_path} is a distilled student, the numpy backend only "
+                         f"runs the LSTM teacher (serve it with keras, onnx or tflite)")
+    lstms = [layer for layer in model.layers
+             if isinstance(layer, tf.keras.layers.LSTM)]
+    repeat = [layer for layer in model.layers
+              if isinstance(layer, tf.keras.layers.RepeatVector)]
+    if len(lstms) != 2 or len(repeat) != 1 or len(lstms) + len(repeat) + 3 != len(model.layers):
+        raise ValueError(f"{keras_path}: expected Input -> LSTM -> RepeatVector -> LSTM -> "
+                         f"regression / classification heads, the numpy backend runs nothing else")
+    for layer in lstms:
+        if layer.activation.__name__ != "tanh" or layer.recurrent_activation.__name__ != "sigmoid":
+            raise ValueError(f"{layer.name}: only tanh/sigmoid LSTMs are supported")
+
+    encoder, decoder = lstms
+    reg_kernel, reg_bias = model.get_layer("regression").get_weights()
+    cls_kernel, cls_bias = model.get_layer("classification").get_weights()
+
+    weights = {
+        "horizon": np.array(repeat[0].n),
+        "reg_kernel": reg_kernel,
+        "reg_bias": reg_bias,
+        "cls_kernel": cls_kernel,
+        "cls_bias": cls_bias,
+    }
+    for prefix, layer in (("enc", encoder), ("dec", decoder)):
+        kernel, recurrent_kernel, bias = layer.get_weights()
+        weights[f"{prefix}_kernel"] = kernel
+        weights[f"{prefix}_recurrent"] = recurrent_kernel
+        weights[f"{prefix}_bias"] = bias
+
+    np.savez_compressed(npz_path, **weights)
+    print(f"exported {keras_path} -> {npz_path}")
+    return npz_path
+
+
+# ============= INFERENCE (numpy only) =============
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def _lstm_step(z, c, units):
+    # keras gate order: input, forget, cell, output
+    i = _sigmoid(z[:, :units])
+    f = _sigmoid(z[:, units:2 * units])
+    g = np.tanh(z[:, 2 * units:3 * units])
+    o = _sigmoid(z[:, 3 * units:])
+    c = f * c + i * g
+    h = o * np.tanh(c)
+    return h, c
+
+
+class NumpyForecastModel:
+    """
+    Pure NumPy forward pass of the forecast model. predict() has the same
+    signature and output as keras: [regression (N, 6, 3), classification (N, 6, 7)].
+    """
+
+    def __init__(self, weights):
+        self.w = {key: np.asarray(value, dtype=np.float32)
+                  for key, value in weights.items() if key != "horizon"}
+        self.horizon = int(weights["horizon"])
+        self.enc_units = self.w["enc_recurrent"].shape[0]
+        self.dec_units = self.w["dec_recurrent"].shape[0]
+
+    @classmethod
+    def load(cls, npz_path=NPZ_PATH):
+        with np.load(npz_path) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def predict(self, X, verbose=0, batch_size=None):
+        X = np.asarray(X, dtype=np.float32)
+        n = X.shape[0]
+        w = self.w
+
+        # encoder: input projection of all 24 steps in one matmul
+        x_proj = X @ w["enc_kernel"] + w["enc_bias"]
+        h = np.zeros((n, self.enc_units), dtype=np.float32)
+        c = np.zeros((n, self.enc_units), dtype=np.float32)
+        for t in range(X.shape[1]):
+            h, c = _lstm_step(x_proj[:, t] + h @ w["enc_recurrent"],
+                              c, self.enc_units)
+
+        # decoder: RepeatVector -> same input every step, project it once
+        x_proj = h @ w["dec_kernel"] + w["dec_bias"]
+        h = np.zeros((n, self.dec_units), dtype=np.float32)
+        c = np.zeros((n, self.dec_units), dtype=np.float32)
+        outputs = []
+        for _ in range(self.horizon):
+            h, c = _lstm_step(x_proj + h @ w["dec_recurrent"],
+                              c, self.dec_units)
+            outputs.append(h)
+        seq = np.stack(outputs, axis=1)
+
+        regression = seq @ w["reg_kernel"] + w["reg_bias"]
+        classification = _softmax(seq @ w["cls_kernel"] + w["cls_bias"])
+        return [regression, classification]
+
+
+def check_against_keras(keras_path=KERAS_PATH, npz_path=NPZ_PATH,
+                        samples=256, tolerance=1e-4):
+    """Golden check: NumPy engine vs model.predict on random windows."""
+    import tensorflow as tf
+
+    keras_model = tf.keras.models.load_model(keras_path)
+    numpy_model = NumpyForecastModel.load(npz_path)
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(samples, PAST_HOURS, FEATURES)).astype(np.float32)
+
+    expected = keras_model.predict(X, verbose=0)
+    got = numpy_model.predict(X)
+
+    reg_diff = float(np.max(np.abs(expected[0] - got[0])))
+    cls_diff = float(np.max(np.abs(expected[1] - got[1])))
+    print(f"max |diff| regression: {reg_diff:.2e}  classification: {cls_diff:.2e}")
+    return reg_diff < tolerance and cls_diff < tolerance
+
+
+if __name__ == "__main__":
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+    if command == "export":
+        export_weights()
+    elif command == "check":
+        ok = check_against_keras()
+        print("OK" if ok else "MISMATCH")
+        sys.exit(0 if ok else 1)
+    else:
+        print("usage: python numpy_lstm.py [export|check]")
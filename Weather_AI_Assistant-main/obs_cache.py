@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import pandas as pd
+
+PAST_HOURS = 24
+# keys are grid cell centers (grid_index.GridIndex.cell), already on the
+# 0.0625° grid or as answered by the API; rounding only absorbs float noise
+COORD_PRECISION = 4
+MAX_CELLS = 512
+
+
+class ObservationCache:
+    """
+    Rolling window of hourly observations per weather-model grid cell
+    (every place in a cell gets the same data from Open-Meteo).
+    Entries are stamped with the UTC hour they are valid for: inside the same
+    hour the window is served from memory, on a new hour only the missing
+    rows have to be fetched and appended.
+    """
+
+    def __init__(self, keep_hours=PAST_HOURS, precision=COORD_PRECISION,
+                 max_cells=MAX_CELLS):
+        self.keep_hours = keep_hours
+        self.precision = precision
+        self.max_cells = max_cells
+        self._entries = OrderedDict()    # cell center (lat, lon) -> (hour, DataFrame)
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "partial": 0, "misses": 0}
+
+    def key(self, lat, lon):
+        return (round(lat, self.precision), round(lon, self.precision))
+
+    def get(self, lat, lon, hour):
+        """Window valid for `hour`, or None."""
+        with self._lock:
+            entry = self._entries.get(self.key(lat, lon))
+            if entry is None or entry[0] != hour:
+                return None
+            self._entries.move_to_end(self.key(lat, lon))
+            self.counters["hits"] += 1
+            return entry[1].copy()
+
+    def missing_range(self, lat, lon, hour):
+        """
+        (start, end) of the hours to download for `hour`, or None when the
+        whole window has to be downloaded again.
+        """
+        with self._lock:
+            entry = self._entries.get(self.key(lat, lon))
+        if entry is None or entry[1].empty:
+            return None
+        start = entry[1]["time"].iloc[-1] + timedelta(hours=1)
+        end = hour - timedelta(hours=1)
+        if end - start >= timedelta(hours=self.keep_hours):
+            return None
+        return start, end
+
+    def update(self, lat, lon, hour, df_new):
+        """Append freshly downloaded rows and keep the last `keep_hours`."""
+        key = self.key(lat, lon)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not df_new.empty:
+                self.counters["partial"] += 1
+                df = pd.concat([entry[1], df_new], ignore_index=True)
+            elif entry is not None:
+                self.counters["partial"] += 1
+                df = entry[1]
+            else:
+                self.counters["misses"] += 1
+                df = df_new
+            df = df.drop_duplicates("time", keep="last")
+            df = df[df["time"] < hour].tail(self.keep_hours)
+            df = df.reset_index(drop=True)
+
+            self._entries[key] = (hour, df)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_cells:
+                self._entries.popitem(last=False)
+            return df.copy()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["cells"] = len(self._entries)
+        return stats
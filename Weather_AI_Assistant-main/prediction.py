@@ -1,11 +1,20 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
-import tensorflow as tf
-import joblib
-import requests
 from datetime import datetime, timedelta
 
-MODEL_PATH = "weather_lstm_6h_prediction.keras"
+import http_client
+from model_registry import ModelRegistry
+from backends import DEFAULT_PATHS as DEFAULT_MODEL_PATHS
+from geocache import GeoCache
+from gazetteer import Gazetteer
+from obs_cache import ObservationCache
+from grid_index import GridIndex
+from inference_queue import InferenceQueue
+
 SCALER_MAIN = "scaler.pkl"
 SCALER_TEMP = "scaler_temp.pkl"
 SCALER_PRECIP = "scaler_precip.pkl"
@@ -26,27 +35,61 @@ STEP_FEATURES = [
     "solar_approx"          # Calculated
 ]
 
-CURRENT_LAT = 0.0
-CURRENT_LON = 0.0
-CURRENT_ELEV = 0.0
-
 STATIC_FEATURES = ["latitude", "longitude", "elevation"]
 
+API_COLS = [
+    "temperature_2m", "relative_humidity_2m", "surface_pressure",
+    "wind_speed_10m", "wind_direction_10m", "precipitation", "cloud_cover"
+]
 
-def get_data_city(city):
-    base_url = "https://geocoding-api.open-meteo.com/v1/search"
-    params = {
-        "name": city
-    }
-    try:
-        response = requests.get(base_url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-    except Exception as e:
-        print(f"cannot get geo correlations for the city provided: {e}")
-        return None
+GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+
+# serving runtime: keras (default), numpy, onnx or tflite (see backends.py)
+MODEL_BACKEND = os.environ.get("WEATHER_MODEL_BACKEND", "keras")
+# threads doing the CPU part (preprocessing, model) of the async API
+PREDICT_WORKERS = int(os.environ.get("WEATHER_PREDICT_WORKERS", 4))
+MODEL_PATH = os.environ.get("WEATHER_MODEL_PATH",
+                            DEFAULT_MODEL_PATHS.get(MODEL_BACKEND, ""))
+
+# loaded once per process, reloaded only when the files change on disk
+REGISTRY = ModelRegistry(MODEL_PATH, SCALER_MAIN, SCALER_TEMP,
+                         SCALER_PRECIP, SCALER_WIND, backend=MODEL_BACKEND)
+
+# offline names (GeoNames dump if present, else retrieve_data.CITIES):
+# fixes misspelled / diacritic-less transcripts before any network call
+GAZETTEER = Gazetteer.load()
+
+# city -> (lat, lon, elev), memory LRU + sqlite on disk
+GEOCACHE = GeoCache()
+
+# coordinates -> weather model grid cell, nearby places share a cell
+GRID = GridIndex()
+
+# grid cell -> hourly window, valid for one UTC hour
+OBS_CACHE = ObservationCache(PAST_HOURS)
+
+
+def current_hour():
+    return datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+
+def _cached_city(city):
+    """(hit, coords, error) from the geocache."""
+    found, coords = GEOCACHE.lookup(city)
+    if not found:
+        return False, None, None
+    if coords is None:
+        print("No results found for this ", city, "(cached)")
+        return True, None, " no result found ..."
+    print(f"got the {city}'s correlations from cache.")
+    return True, coords, None
+
+
+def _parse_city(city, data):
     if "results" not in data or len(data["results"]) == 0:
         print("No results found for this ", city)
+        GEOCACHE.put(city, None)
         return None, " no result found ..."
 
     result = data["results"][0]
@@ -54,53 +97,228 @@ def get_data_city(city):
     lat = result.get('latitude')
     lon = result.get('longitude')
     elev = result.get('elevation')
+    GEOCACHE.put(city, (lat, lon, elev))
     print(
         f"got the {city}'s correlations. now searching for its weather nalysis for past 24h")
     return (lat, lon, elev), None
 
 
-def get_live_data():
+def _resolve_offline(city):
+    """
+    (coords, name) from the gazetteer. coords is None when the place is
+    unknown or has no elevation (always the case without RO.txt); name is
+    then what to look up in the geocache / geocoding API: the canonical
+    name for an exact or alias match ("Iași" -> Iasi), the user's own
+    string otherwise (a prefix / fuzzy "correction" of a place outside the
+    gazetteer would send e.g. "Romans" to Roman).
+    """
+    entry, how = GAZETTEER.match(city)
+    if entry is None:
+        return None, city
+    if entry["elevation"] is None:
+        return None, entry["name"] if how == "exact" else city
+    print(f"got the {city}'s correlations offline ({entry['name']}).")
+    return (entry["latitude"], entry["longitude"], entry["elevation"]), entry["name"]
+
+
+def get_data_city(city):
+    coords, city = _resolve_offline(city)
+    if coords is not None:
+        return coords, None
+
+    hit, coords, error = _cached_city(city)
+    if hit:
+        return coords, error
+
+    try:
+        data = http_client.get_json(GEOCODING_URL, params={"name": city})
+    except Exception as e:
+        print(f"cannot get geo correlations for the city provided: {e}")
+        return None, " geocoding error"
+    return _parse_city(city, data)
+
+
+async def get_data_city_async(city):
+    coords, city = _resolve_offline(city)
+    if coords is not None:
+        return coords, None
+
+    hit, coords, error = _cached_city(city)
+    if hit:
+        return coords, error
+
+    try:
+        data = await http_client.get_json_async(GEOCODING_URL, params={"name": city})
+    except Exception as e:
+        print(f"cannot get geo correlations for the city provided: {e}")
+        return None, " geocoding error"
+    return _parse_city(city, data)
 
-    api_cols = [
-        "temperature_2m", "relative_humidity_2m", "surface_pressure",
-        "wind_speed_10m", "wind_direction_10m", "precipitation", "cloud_cover"
-    ]
 
-    url = "https://api.open-meteo.com/v1/forecast"
+def _hourly_params(locations, extra_params):
+    # one HTTP call for all locations (comma separated latitude/longitude)
     params = {
-        "latitude": CURRENT_LAT,
-        "longitude": CURRENT_LON,
-        "hourly": ",".join(api_cols),
-        "past_days": 2,
-        "forecast_days": 1,
+        "latitude": ",".join(str(lat) for lat, lon, *_ in locations),
+        "longitude": ",".join(str(lon) for lat, lon, *_ in locations),
+        "hourly": ",".join(API_COLS),
         "timezone": "UTC",
         "wind_speed_unit": "kmh"
     }
+    params.update(extra_params)
+    return params
 
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-    except Exception as e:
-        print(f"API Error: {e}")
-        return None, "weather API error"
 
-    df = pd.DataFrame(data['hourly'])
-    df['time'] = pd.to_datetime(df['time'])
+def _hourly_frames(data):
+    """(DataFrame, grid cell center) per location."""
+    # a single location answers with an object, several with a list
+    if isinstance(data, dict):
+        data = [data]
+
+    frames = []
+    for item in data:
+        df = pd.DataFrame(item['hourly'])
+        df['time'] = pd.to_datetime(df['time'])
+        frames.append((df, (item['latitude'], item['longitude'])))
+    return frames
+
+
+def download_hourly(locations, extra_params):
+    """One (hourly DataFrame, cell center) per location, in the same order."""
+    data = http_client.get_json(
+        FORECAST_URL, params=_hourly_params(locations, extra_params))
+    return _hourly_frames(data)
+
+
+async def download_hourly_async(locations, extra_params):
+    data = await http_client.get_json_async(
+        FORECAST_URL, params=_hourly_params(locations, extra_params))
+    return _hourly_frames(data)
+
+
+def _plan_live_data(locations, now):
+    """
+    Windows served from the cache, plus the downloads still needed as
+    (extra_params, members): every download is one HTTP call and every
+    member is the list of location indexes sharing one grid cell, so a
+    cell is only requested once.
+    """
+    windows = [None] * len(locations)
+
+    # same cell, same hour -> the 24h window did not change.
+    # the others are grouped by the range they miss
+    groups = {}
+    for i, (lat, lon, elev) in enumerate(locations):
+        cell = GRID.cell(lat, lon)
+        windows[i] = OBS_CACHE.get(*cell, now)
+        if windows[i] is None:
+            missing = OBS_CACHE.missing_range(*cell, now)
+            groups.setdefault(missing, {}).setdefault(cell, []).append(i)
+
+    downloads = []
+    for missing, cells in groups.items():
+        if missing is not None:
+            # new hour: only download the rows we do not have yet
+            extra = {
+                "start_hour": missing[0].strftime("%Y-%m-%dT%H:%M"),
+                "end_hour": missing[1].strftime("%Y-%m-%dT%H:%M"),
+            }
+        else:
+            extra = {"past_days": 2, "forecast_days": 1}
+        downloads.append((extra, list(cells.values())))
+    return windows, downloads
+
+
+def _request_locations(locations, members):
+    # one representative per cell
+    return [locations[indexes[0]] for indexes in members]
+
+
+def _store_live_data(locations, now, windows, errors, members, frames, error):
+    if error is not None:
+        print(f"API Error: {error}")
+        for indexes in members:
+            for i in indexes:
+                errors[i] = "weather API error"
+        return
+    for indexes, (df, center) in zip(members, frames):
+        # the answer tells the real cell center, later lookups snap to it
+        cell = GRID.register(*center, points=[locations[i][:2] for i in indexes])
+        window = OBS_CACHE.update(*cell, now, df)
+        for i in indexes:
+            windows[i] = window.copy()
+
+
+def _finish_live_data(locations, windows, errors):
+    results = []
+    for (lat, lon, elev), df_hist, error in zip(locations, windows, errors):
+        if error:
+            results.append((None, error))
+            continue
+
+        df_hist['latitude'] = lat
+        df_hist['longitude'] = lon
+        df_hist['elevation'] = elev
+
+        if len(df_hist) < 24:
+            print(
+                f"Error: Not enough data. Needed 24 rows, got {len(df_hist)}")
+            results.append((None, " not enough data"))
+            continue
+
+        results.append((df_hist, None))
+    return results
+
 
-    df['latitude'] = CURRENT_LAT
-    df['longitude'] = CURRENT_LON
-    df['elevation'] = CURRENT_ELEV
+def get_live_data_batch(locations):
+    """
+    locations: list of (lat, lon, elev).
+    Returns a list of (df, error) in the same order.
+    """
+    now = current_hour()
+    windows, downloads = _plan_live_data(locations, now)
+    errors = [None] * len(locations)
+
+    for extra, members in downloads:
+        frames, error = None, None
+        try:
+            frames = download_hourly(
+                _request_locations(locations, members), extra)
+        except Exception as e:
+            error = e
+        _store_live_data(locations, now, windows, errors,
+                         members, frames, error)
+
+    return _finish_live_data(locations, windows, errors)
+
+
+async def get_live_data_batch_async(locations):
+    now = current_hour()
+    windows, downloads = _plan_live_data(locations, now)
+    errors = [None] * len(locations)
+
+    # the groups are independent -> download them concurrently
+    replies = await asyncio.gather(
+        *(download_hourly_async(_request_locations(locations, members), extra)
+          for extra, members in downloads),
+        return_exceptions=True)
 
-    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
-    df_hist = df[df['time'] < now].tail(PAST_HOURS).copy()
+    for (extra, members), reply in zip(downloads, replies):
+        if isinstance(reply, Exception):
+            _store_live_data(locations, now, windows, errors,
+                             members, None, reply)
+        else:
+            _store_live_data(locations, now, windows, errors,
+                             members, reply, None)
 
-    if len(df_hist) < 24:
-        print(f"Error: Not enough data. Needed 24 rows, got {len(df_hist)}")
-        return None, " not enough data"
+    return _finish_live_data(locations, windows, errors)
 
-    # print(df_hist.tail(24))
-    return df_hist.reset_index(drop=True), None
+
+def get_live_data(lat, lon, elev):
+    return get_live_data_batch([(lat, lon, elev)])[0]
+
+
+async def get_live_data_async(lat, lon, elev):
+    return (await get_live_data_batch_async([(lat, lon, elev)]))[0]
 
 
 def preprocess_data(df, scaler):
@@ -146,6 +364,88 @@ def preprocess_data(df, scaler):
     return X_seq.reshape(1, PAST_HOURS, 16), df['time'].iloc[-1], last_raw_values
 
 
+# ============= NUMPY FAST PATH =============
+# Same features as preprocess_data without pandas. The lookup tables use the
+# exact same expressions, so the values are bit-for-bit identical.
+
+_HOURS = np.arange(24)
+_DAYS = np.arange(367)                   # dayofyear is 1..366
+SUN_LUT = np.maximum(np.sin((_HOURS - 6) * np.pi / 12), 0)
+HOUR_SIN_LUT = np.sin(2 * np.pi * _HOURS/24)
+HOUR_COS_LUT = np.cos(2 * np.pi * _HOURS/24)
+DOW_SIN_LUT = np.sin(2 * np.pi * _DAYS/365)
+DOW_COS_LUT = np.cos(2 * np.pi * _DAYS/365)
+
+# column positions in the raw (N, 24, 7) block, same order as API_COLS
+_RAW = {name: i for i, name in enumerate(API_COLS)}
+
+
+def window_arrays(df):
+    """Raw numpy inputs of one 24h window DataFrame."""
+    times = df['time'].to_numpy().astype("datetime64[h]")
+    raw = np.column_stack([df[col].to_numpy(dtype=np.float64) for col in API_COLS])
+    static = np.array([df[col].iloc[-1] for col in STATIC_FEATURES], dtype=np.float64)
+    return raw, times, static
+
+
+def preprocess_arrays(raw, times, static, scaler):
+    """
+    raw: (N, 24, 7) API_COLS values, times: (N, 24) datetime64[h] in UTC,
+    static: (N, 3) latitude, longitude, elevation.
+    Returns X (N, 24, 16), last temperature (N,), last wind (N,).
+    """
+    n, steps, _ = raw.shape
+    hour = times.astype(np.int64) % 24
+    day = (times.astype("datetime64[D]") - times.astype("datetime64[Y]")).astype(np.int64) + 1
+
+    temp = raw[:, :, _RAW["temperature_2m"]]
+    temp_diff = np.zeros_like(temp)
+    temp_diff[:, 1:] = temp[:, 1:] - temp[:, :-1]
+
+    solar = SUN_LUT[hour] * (1 - (raw[:, :, _RAW["cloud_cover"]] / 100.0))
+
+    # STEP_FEATURES + STATIC_FEATURES, in the order the scaler was fitted
+    scaled = np.empty((n, steps, len(STEP_FEATURES) + len(STATIC_FEATURES)))
+    computed = {"temp_diff": temp_diff, "solar_approx": solar}
+    for j, name in enumerate(STEP_FEATURES):
+        scaled[:, :, j] = computed[name] if name in computed else raw[:, :, _RAW[name]]
+    scaled[:, :, len(STEP_FEATURES):] = static[:, None, :]
+    scaled -= scaler.mean_
+    scaled /= scaler.scale_
+
+    X = np.empty((n, steps, 16))
+    X[:, :, :9] = scaled[:, :, :9]
+    X[:, :, 9] = HOUR_SIN_LUT[hour]
+    X[:, :, 10] = HOUR_COS_LUT[hour]
+    X[:, :, 11] = DOW_SIN_LUT[day]
+    X[:, :, 12] = DOW_COS_LUT[day]
+    X[:, :, 13:] = scaled[:, :, 9:]
+
+    return X, temp[:, -1], raw[:, -1, _RAW["wind_speed_10m"]]
+
+
+def preprocess_fast(df, scaler):
+    """Drop-in replacement of preprocess_data (same outputs, no DataFrame work)."""
+    raw, times, static = window_arrays(df)
+    X, last_temp, last_wind = preprocess_arrays(
+        raw[None], times[None], static[None], scaler)
+    last_raw_values = {"temp": float(last_temp[0]), "wind": float(last_wind[0])}
+    return X, df['time'].iloc[-1], last_raw_values
+
+
+def preprocess_batch(windows, scaler):
+    """
+    windows: window_arrays() of many cities. One vectorized pass for all of
+    them: X (N, 24, 16) and the last raw values of each window.
+    """
+    X, last_temp, last_wind = preprocess_arrays(
+        np.stack([w[0] for w in windows]), np.stack([w[1] for w in windows]),
+        np.stack([w[2] for w in windows]), scaler)
+    last_raw = [{"temp": float(t), "wind": float(w)}
+                for t, w in zip(last_temp, last_wind)]
+    return X, last_raw
+
+
 def decode_weather_smart(probs):
     """
     Look at the probabilities. If Rain/Snow has > 25% chance, report it.
@@ -171,53 +471,39 @@ def decode_weather_smart(probs):
     return mapping.get(idx, "Unknown")
 
 
-def predict_weather(city: str) -> dict:
-    global CURRENT_LAT, CURRENT_LON, CURRENT_ELEV
-
-    print("WEATHER PREDICTOR :")
-    try:
-        model = tf.keras.models.load_model(MODEL_PATH)
-        scaler = joblib.load(SCALER_MAIN)
-        t_scaler = joblib.load(SCALER_TEMP)
-        p_scaler = joblib.load(SCALER_PRECIP)
-        w_scaler = joblib.load(SCALER_WIND)
-    except Exception as e:
-        print(f"Error loading files: {e}")
-        return
-
-    coords, error = get_data_city(city)
-    if error:
-        return {"status": "error", "message": error}
-
-    CURRENT_LAT, CURRENT_LON, CURRENT_ELEV = coords
-
-    df, error = get_live_data()
-    if error:
-        return {"status": "error", "message": error}
-
-    try:
-        X_input, last_ts, last_raw = preprocess_data(df, scaler)
-    except Exception as e:
-        return {"status": "error", "message": f"Preprocessing error: {e}"}
-
-    print(f"\n--- Last Hour Data for {city} ({last_ts}) ---")
-    print(f"Temperature: {last_raw['temp']} °C")
-    print(f"Wind Speed:  {last_raw['wind']} km/h")
-
-    print("Predicting...")
-    preds = model.predict(X_input, verbose=0)
+# every label decode_weather_smart can return, for the vectorized version
+WEATHER_LABELS = [
+    "Clear", "Cloudy", "Fog", "Rain (Light)", "Rain (Heavy)", "Snow/Ice",
+    "Thunderstorm", "Thunderstorm (Risk)", "Snow (Possible)", "Rain (Possible)",
+]
 
-    reg_pred = preds[0][0]
-    cls_pred = preds[1][0]
 
-    # Unscale predictions
-    pred_temp = t_scaler.inverse_transform(
+def decode_weather_smart_batch(probs):
+    """
+    decode_weather_smart over a (..., 7) array of probabilities at once.
+    Returns indexes into WEATHER_LABELS.
+    """
+    probs = np.asarray(probs)
+    labels = np.argmax(probs, axis=-1)
+    # same priority as decode_weather_smart: storm, then snow, then rain
+    labels = np.where(probs[..., 3] + probs[..., 4] > 0.25, 9, labels)
+    labels = np.where(probs[..., 5] > 0.25, 8, labels)
+    labels = np.where(probs[..., 6] > 0.20, 7, labels)
+    return labels
+
+
+def unscale_prediction(reg_pred, bundle):
+    """(temp, precip, wind) in real units from one (6, 3) regression output."""
+    pred_temp = bundle["t_scaler"].inverse_transform(
         reg_pred[:, 0].reshape(-1, 1)).flatten()
-    pred_precip = p_scaler.inverse_transform(
+    pred_precip = bundle["p_scaler"].inverse_transform(
         reg_pred[:, 1].reshape(-1, 1)).flatten()
-    pred_wind = w_scaler.inverse_transform(
+    pred_wind = bundle["w_scaler"].inverse_transform(
         reg_pred[:, 2].reshape(-1, 1)).flatten()
+    return pred_temp, pred_precip, pred_wind
+
 
+def anchor_forecast(pred_temp, pred_precip, pred_wind, cls_pred, last_raw):
     # === DUAL ANCHORING ===    for better prediction avoid giving an unrelavant result than last hour
 
     temp_offset = (last_raw['temp'] - pred_temp[0]) * 0.9
@@ -239,11 +525,16 @@ def predict_weather(city: str) -> dict:
             "condition": cond
         })
 
-    print(f"\n--- Prediction Results (Next {FUTURE_HORIZON} Hours) ---")
-    for item in forecast_data:
-        print(f"Hour +{item['hour']}: {item['condition']:<15} | Temp: {item['temp_c']:>5.1f}°C | Wind: {item['wind_kmh']:>5.1f} km/h | Precip: {item['precip_mm']:>4.2f} mm")
-    print("------------------------------------------\n")
+    return forecast_data
+
+
+def postprocess_prediction(reg_pred, cls_pred, last_raw, bundle):
+    """Unscale one (6, 3) regression + (6, 7) classification output."""
+    pred_temp, pred_precip, pred_wind = unscale_prediction(reg_pred, bundle)
+    return anchor_forecast(pred_temp, pred_precip, pred_wind, cls_pred, last_raw)
+
 
+def build_result(city, last_raw, forecast_data):
     return {
         "status": "success",
         "city_name": city,
@@ -255,10 +546,268 @@ def predict_weather(city: str) -> dict:
     }
 
 
+class Predictor:
+    """
+    City name -> 6h forecast.
+
+    Concurrency: one Predictor can be shared by any number of threads (or
+    asyncio tasks through an executor). The location of a request only
+    travels through arguments and local variables, never through module
+    or instance state. The shared pieces are thread-safe on their own:
+    the model registry, the geocache and the observation cache use locks,
+    and calls into the model are serialized with the bundle's predict lock
+    because Keras does not promise a thread-safe predict().
+
+    Places in the same weather-model grid cell (see grid_index.py) share
+    one fetch and, within the same UTC hour, one inference result. With a
+    batcher (inference_queue.py) the windows of concurrent requests are
+    also run together as one batch. The async API runs its CPU part on
+    executor (a bounded pool; None = asyncio's default one).
+    """
+
+    def __init__(self, registry=None, geocode=None, live_data=None,
+                 geocode_async=None, live_data_async=None, batcher=None, executor=None):
+        self.registry = registry or REGISTRY
+        self.geocode = geocode or get_data_city
+        self.live_data = live_data or get_live_data_batch
+        self.geocode_async = geocode_async or get_data_city_async
+        self.live_data_async = live_data_async or get_live_data_batch_async
+        # optional InferenceQueue: concurrent requests share one model call
+        self.batcher = batcher
+        self.executor = executor
+        # (grid cell, hour) -> result of the first city asked in that cell
+        self._shared = {}
+        self._shared_lock = threading.Lock()
+
+    def _shared_get(self, city, coords, hour):
+        with self._shared_lock:
+            result = self._shared.get((GRID.cell(coords[0], coords[1]), hour))
+        if result is None:
+            return None
+        print(f"{city} is in the same grid cell as {result['city_name']}, sharing its forecast")
+        return dict(result, city_name=city)
+
+    def _shared_put(self, coords, hour, result):
+        if result is None or result.get("status") != "success":
+            return
+        with self._shared_lock:
+            # only the current hour is ever asked again
+            for key in [k for k in self._shared if k[1] != hour]:
+                del self._shared[key]
+            self._shared[(GRID.cell(coords[0], coords[1]), hour)] = result
+
+    def _run_model(self, bundle, X_input):
+        if self.batcher is not None:
+            return self.batcher.predict(bundle, X_input)
+        with bundle["predict_lock"]:
+            return bundle["model"].predict(X_input, verbose=0)
+
+    def _forecast(self, city, bundle, df):
+        try:
+            X_input, last_ts, last_raw = preprocess_fast(df, bundle["scaler"])
+        except Exception as e:
+            return {"status": "error", "message": f"Preprocessing error: {e}"}
+
+        print(f"\n--- Last Hour Data for {city} ({last_ts}) ---")
+        print(f"Temperature: {last_raw['temp']} °C")
+        print(f"Wind Speed:  {last_raw['wind']} km/h")
+
+        print("Predicting...")
+        preds = self._run_model(bundle, X_input)
+
+        forecast_data = postprocess_prediction(
+            preds[0][0], preds[1][0], last_raw, bundle)
+
+        print(f"\n--- Prediction Results (Next {FUTURE_HORIZON} Hours) ---")
+        for item in forecast_data:
+            print(f"Hour +{item['hour']}: {item['condition']:<15} | Temp: {item['temp_c']:>5.1f}°C | Wind: {item['wind_kmh']:>5.1f} km/h | Precip: {item['precip_mm']:>4.2f} mm")
+        print("------------------------------------------\n")
+
+        return build_result(city, last_raw, forecast_data)
+
+    def _forecast_batch(self, cities, bundle, results, located, live, hour):
+        windows = []
+        pending = []
+        cell_rows = {}
+        followers = []
+        for (i, coords), (df, error) in zip(located, live):
+            if error:
+                results[i] = {"status": "error", "message": error}
+                continue
+            cell = GRID.cell(coords[0], coords[1])
+            if cell in cell_rows:
+                # same grid cell as an earlier city -> same inference
+                followers.append((i, cell))
+                continue
+            try:
+                arrays = window_arrays(df)
+            except Exception as e:
+                results[i] = {"status": "error",
+                              "message": f"Preprocessing error: {e}"}
+                continue
+            cell_rows[cell] = len(windows)
+            windows.append(arrays)
+            pending.append((i, coords))
+
+        if windows:
+            X_input, last_raws = preprocess_batch(windows, bundle["scaler"])
+            print(f"Predicting {len(windows)} grid cells in one batch...")
+            preds = self._run_model(bundle, X_input)
+            for row, (i, coords) in enumerate(pending):
+                last_raw = last_raws[row]
+                forecast_data = postprocess_prediction(
+                    preds[0][row], preds[1][row], last_raw, bundle)
+                results[i] = build_result(cities[i], last_raw, forecast_data)
+                self._shared_put(coords, hour, results[i])
+
+        for i, cell in followers:
+            leader = results[pending[cell_rows[cell]][0]]
+            results[i] = dict(leader, city_name=cities[i])
+
+        return results
+
+    def predict(self, city: str) -> dict:
+        print("WEATHER PREDICTOR :")
+        try:
+            bundle = self.registry.get()
+        except Exception as e:
+            print(f"Error loading files: {e}")
+            return
+
+        coords, error = self.geocode(city)
+        if error:
+            return {"status": "error", "message": error}
+
+        hour = current_hour()
+        shared = self._shared_get(city, coords, hour)
+        if shared is not None:
+            return shared
+
+        df, error = self.live_data([coords])[0]
+        if error:
+            return {"status": "error", "message": error}
+
+        result = self._forecast(city, bundle, df)
+        self._shared_put(coords, hour, result)
+        return result
+
+    def predict_batch(self, cities: list[str]) -> list[dict]:
+        """
+        Same result as predict() for every city, but the history of all
+        cities is downloaded in one HTTP call and the model runs once on a
+        (N, 24, 16) batch.
+        """
+        print(f"WEATHER PREDICTOR (batch of {len(cities)}) :")
+        try:
+            bundle = self.registry.get()
+        except Exception as e:
+            print(f"Error loading files: {e}")
+            return [{"status": "error", "message": "model not available"} for _ in cities]
+
+        results = [None] * len(cities)
+
+        hour = current_hour()
+        located = []
+        for i, city in enumerate(cities):
+            coords, error = self.geocode(city)
+            if error:
+                results[i] = {"status": "error", "message": error}
+                continue
+            results[i] = self._shared_get(city, coords, hour)
+            if results[i] is None:
+                located.append((i, coords))
+
+        live = self.live_data([coords for _, coords in located])
+        return self._forecast_batch(cities, bundle, results, located, live, hour)
+
+    async def _offload(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def predict_async(self, city: str) -> dict:
+        """
+        predict() for the event loop: HTTP calls are awaited, the CPU part
+        (loading, preprocessing, model) runs in a worker thread.
+        """
+        print("WEATHER PREDICTOR :")
+        try:
+            bundle = await self._offload(self.registry.get)
+        except Exception as e:
+            print(f"Error loading files: {e}")
+            return
+
+        coords, error = await self.geocode_async(city)
+        if error:
+            return {"status": "error", "message": error}
+
+        hour = current_hour()
+        shared = self._shared_get(city, coords, hour)
+        if shared is not None:
+            return shared
+
+        df, error = (await self.live_data_async([coords]))[0]
+        if error:
+            return {"status": "error", "message": error}
+
+        result = await self._offload(self._forecast, city, bundle, df)
+        self._shared_put(coords, hour, result)
+        return result
+
+    async def predict_batch_async(self, cities: list[str]) -> list[dict]:
+        print(f"WEATHER PREDICTOR (batch of {len(cities)}) :")
+        try:
+            bundle = await self._offload(self.registry.get)
+        except Exception as e:
+            print(f"Error loading files: {e}")
+            return [{"status": "error", "message": "model not available"} for _ in cities]
+
+        results = [None] * len(cities)
+
+        hour = current_hour()
+        geocoded = await asyncio.gather(*(self.geocode_async(city) for city in cities))
+        located = []
+        for i, (coords, error) in enumerate(geocoded):
+            if error:
+                results[i] = {"status": "error", "message": error}
+                continue
+            results[i] = self._shared_get(cities[i], coords, hour)
+            if results[i] is None:
+                located.append((i, coords))
+
+        live = await self.live_data_async([coords for _, coords in located])
+        return await self._offload(
+            self._forecast_batch, cities, bundle, results, located, live, hour)
+
+
+# shared by the module level helpers below (safe to use from many threads)
+PREDICTOR = Predictor(batcher=InferenceQueue(),
+                      executor=ThreadPoolExecutor(PREDICT_WORKERS, thread_name_prefix="predict"))
+
+
+def predict_weather(city: str) -> dict:
+    return PREDICTOR.predict(city)
+
+
+def predict_weather_batch(cities: list[str]) -> list[dict]:
+    return PREDICTOR.predict_batch(cities)
+
+
+async def predict_weather_async(city: str) -> dict:
+    return await PREDICTOR.predict_async(city)
+
+
+async def predict_weather_batch_async(cities: list[str]) -> list[dict]:
+    return await PREDICTOR.predict_batch_async(cities)
+
+
 if __name__ == "__main__":
     import sys
     # Use Bucharest as default if no arg provided
     city = "Bucharest"
+    if len(sys.argv) > 2:
+        # several cities -> one batched request / one model call
+        for result in predict_weather_batch(sys.argv[1:]):
+            print(result)
+        sys.exit(0)
     if len(sys.argv) > 1:
         city = sys.argv[1]
     
@@ -0,0 +1,192 @@
+import glob
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+
+from backends import KERAS_PATH, ONNX_PATH, create_backend, unrolled_copy
+
+DYNAMIC_PATH = "weather_lstm_6h_prediction_dynamic.tflite"
+INT8_PATH = "weather_lstm_6h_prediction_int8.tflite"
+ONNX_INT8_PATH = "weather_lstm_6h_prediction_int8.onnx"
+REPORT_PATH = "quantization_report.json"
+
+SCALER_TEMP = "scaler_temp.pkl"
+SCALER_PRECIP = "scaler_precip.pkl"
+SCALER_WIND = "scaler_wind.pkl"
+
+CALIBRATION_SAMPLES = 500
+EVAL_SAMPLES = 5000
+
+
+def load_samples(count, seed=0, files=None):
+    """
+    Random windows (and targets) from the X_train_part_*.npy chunks, or
+    from files = (x_files, y_files) when given (e.g. held-out chunks).
+    """
+    if files is not None:
+        x_files, y_files = files
+    else:
+        x_files = sorted(glob.glob("X_train_part_*.npy"))
+        y_files = sorted(glob.glob("y_train_part_*.npy"))
+    if not x_files:
+        raise FileNotFoundError("no X_train_part_*.npy chunks, run build_trainingset.py first")
+
+    rng = np.random.default_rng(seed)
+    per_file = max(1, count // len(x_files))
+    xs, ys = [], []
+    for xf, yf in zip(x_files, y_files):
+        X = np.load(xf, mmap_mode="r")
+        Y = np.load(yf, mmap_mode="r")
+        idx = np.sort(rng.choice(len(X), size=min(per_file, len(X)), replace=False))
+        xs.append(np.asarray(X[idx], dtype=np.float32))
+        ys.append(np.asarray(Y[idx], dtype=np.float32))
+    return np.concatenate(xs)[:count], np.concatenate(ys)[:count]
+
+
+# ============= QUANTIZATION =============
+
+def quantize_dynamic(keras_path=KERAS_PATH, out_path=DYNAMIC_PATH):
+    """int8 weights, float activations: no calibration data needed."""
+    import tensorflow as tf
+
+    model = unrolled_copy(tf.keras.models.load_model(keras_path))
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    with open(out_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"dynamic range int8 model -> {out_path}")
+    return out_path
+
+
+def quantize_int8(keras_path=KERAS_PATH, out_path=INT8_PATH,
+                  calibration_samples=CALIBRATION_SAMPLES):
+    """
+    int8 weights and activations, ranges calibrated on windows of the
+    training chunks (the same data the model was fitted on, not held out).
+    """
+    import tensorflow as tf
+
+    X_cal, _ = load_samples(calibration_samples, seed=1)
+
+    def representative_dataset():
+        for window in X_cal:
+            yield [window[None, :, :]]
+
+    model = unrolled_copy(tf.keras.models.load_model(keras_path))
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    # int8 kernels only: an op that cannot be quantized makes the conversion
+    # fail instead of silently staying float
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    # input / output stay float32 so the backend interface does not change
+    with open(out_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"calibrated int8 model ({len(X_cal)} windows) -> {out_path}")
+    return out_path
+
+
+def quantize_onnx(onnx_path=ONNX_PATH, out_path=ONNX_INT8_PATH):
+    """Dynamic int8 for onnxruntime (python backends.py convert onnx first)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic as ort_quantize
+
+    ort_quantize(onnx_path, out_path, weight_type=QuantType.QInt8)
+    print(f"onnx dynamic int8 model -> {out_path}")
+    return out_path
+
+
+# ============= REPORT =============
+
+def _latency_ms(backend, X, repeats=20):
+    backend.predict(X)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        backend.predict(X)
+    return round((time.perf_counter() - start) / repeats * 1000, 3)
+
+
+def evaluate(backend, X, Y, scalers):
+    """MAE of the unscaled regression targets and classification accuracy."""
+    regression, classification = backend.predict(X)
+    metrics = {}
+    for k, (name, scaler) in enumerate(zip(("temp", "precip", "wind"), scalers)):
+        pred = scaler.inverse_transform(regression[:, :, k].reshape(-1, 1))
+        true = scaler.inverse_transform(Y[:, :, k].reshape(-1, 1))
+        metrics[f"{name}_mae"] = round(float(np.mean(np.abs(pred - true))), 4)
+    labels = Y[:, :, 3].astype(np.int64)
+    metrics["class_accuracy"] = round(
+        float(np.mean(np.argmax(classification, axis=-1) == labels)), 4)
+    return metrics, regression, classification
+
+
+def report(candidates, eval_samples=EVAL_SAMPLES, out_path=REPORT_PATH,
+           title="Quantization report", files=None):
+    """
+    candidates: {label: (backend name, model path)}. The first one is the
+    float reference the others are compared against, on the argmax class
+    and on the condition decode_weather_smart would say out loud.
+    """
+    from prediction import decode_weather_smart_batch
+
+    X, Y = load_samples(eval_samples, seed=2, files=files)
+    scalers = [joblib.load(p) for p in (SCALER_TEMP, SCALER_PRECIP, SCALER_WIND)]
+
+    results = {}
+    reference = None
+    for label, (name, path) in candidates.items():
+        if not os.path.exists(path):
+            print(f"{label}: {path} missing, skipped")
+            continue
+        backend = create_backend(name, path).load()
+        metrics, regression, classification = evaluate(backend, X, Y, scalers)
+        if reference is None:
+            reference = (regression, classification)
+        metrics["max_diff_vs_float"] = round(
+            float(np.max(np.abs(regression - reference[0]))), 5)
+        metrics["class_agreement_vs_float"] = round(float(np.mean(
+            np.argmax(classification, -1) == np.argmax(reference[1], -1))), 4)
+        # the thresholds of decode_weather_smart react to flatter / sharper
+        # probabilities even when the argmax stays the same
+        metrics["label_agreement_vs_float"] = round(float(np.mean(
+            decode_weather_smart_batch(classification) == decode_weather_smart_batch(reference[1]))), 4)
+        metrics["latency_ms_batch_1"] = _latency_ms(backend, X[:1])
+        metrics["latency_ms_batch_256"] = _latency_ms(backend, X[:256], repeats=5)
+        metrics["size_kb"] = round(os.path.getsize(path) / 1024, 1)
+        results[label] = metrics
+
+    print(f"\n--- {title} ({len(X)} windows) ---")
+    print(f"{'model':<18}{'temp':>7}{'precip':>8}{'wind':>7}{'acc':>7}{'agree':>7}{'label':>7}{'ms@1':>8}{'ms@256':>8}{'KB':>8}")
+    for label, m in results.items():
+        print(f"{label:<18}{m['temp_mae']:>7.3f}{m['precip_mae']:>8.3f}{m['wind_mae']:>7.3f}"
+              f"{m['class_accuracy']:>7.3f}{m['class_agreement_vs_float']:>7.3f}{m['label_agreement_vs_float']:>7.3f}"
+              f"{m['latency_ms_batch_1']:>8.3f}{m['latency_ms_batch_256']:>8.2f}{m['size_kb']:>8.1f}")
+
+    with open(out_path, "w") as f:
+        json.dump({"eval_samples": len(X), "models": results}, f, indent=2)
+    print(f"saved {out_path}")
+    return results
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "all"
+
+    if command in ("dynamic", "all"):
+        quantize_dynamic()
+    if command in ("int8", "all"):
+        quantize_int8()
+    if command == "onnx" or (command == "all" and os.path.exists(ONNX_PATH)):
+        quantize_onnx()
+    if command in ("report", "all"):
+        report({
+            "keras float": ("keras", KERAS_PATH),
+            "onnx float": ("onnx", ONNX_PATH),
+            "tflite dyn": ("tflite", DYNAMIC_PATH),
+            "tflite int8": ("tflite", INT8_PATH),
+            "onnx int8": ("onnx", ONNX_INT8_PATH),
+        })
+    if command not in ("dynamic", "int8", "onnx", "report", "all"):
+        print("usage: python quantize.py [dynamic|int8|onnx|report|all]")
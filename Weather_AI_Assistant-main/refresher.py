@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import prediction
+from forecast_cache import FORECAST_CACHE
+from gazetteer import fold
+
+TOP_N = 10
+REFRESH_DELAY_S = 30      # after the hour boundary, lets Open-Meteo publish the last hour
+DECAY = 0.5               # counts are halved every hour so old favourites fade out
+
+
+class ForecastRefresher:
+    """
+    Counts which cities weather_tool is asked about and, at every UTC hour
+    boundary, recomputes the forecasts of the top-N of them with one
+    batched call. That fills the geocache, the observation cache and the
+    predictor's per-(grid cell, hour) results, so the first user query of
+    the hour is answered without a download or a model call. The results
+    are also put in the forecast cache in front of weather_tool.
+    """
+
+    def __init__(self, predictor=None, top_n=TOP_N, delay=REFRESH_DELAY_S, decay=DECAY,
+                 cache=FORECAST_CACHE):
+        self.predictor = predictor or prediction.PREDICTOR
+        self.cache = cache
+        self.top_n = top_n
+        self.delay = delay
+        self.decay = decay
+        self.counts = {}        # folded name -> (decayed) number of queries
+        self.names = {}         # folded name -> spelling last used
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.last_refresh = None
+        self.last_refresh_s = None
+        self.last_cities = []
+
+    def record(self, city):
+        key = fold(city)
+        if not key:
+            return
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.names[key] = city
+
+    def hot_cities(self, n=None):
+        with self._lock:
+            ranked = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)
+            return [self.names[key] for key, _ in ranked[:n or self.top_n]]
+
+    def _age(self):
+        with self._lock:
+            for key in list(self.counts):
+                self.counts[key] *= self.decay
+                if self.counts[key] < 0.1:
+                    del self.counts[key]
+                    del self.names[key]
+
+    async def refresh(self):
+        """Recompute the hot cities now (one batched fetch + inference)."""
+        cities = self.hot_cities()
+        if not cities:
+            return []
+        print(f"Refreshing forecasts for {len(cities)} hot cities: {', '.join(cities)}")
+        start = time.perf_counter()
+        results = await self.predictor.predict_batch_async(cities)
+        self.last_refresh_s = time.perf_counter() - start
+        self.last_refresh = datetime.utcnow()
+        self.last_cities = cities
+        self.refreshes += 1
+        if self.cache is not None:
+            for city, result in zip(cities, results):
+                self.cache.put(city, result)
+        return results
+
+    @staticmethod
+    def seconds_to_next_hour(now=None):
+        now = now or datetime.utcnow()
+        next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        return (next_hour - now).total_seconds()
+
+    async def run(self):
+        """Forever: sleep until the next UTC hour (+ delay), then refresh."""
+        while True:
+            await asyncio.sleep(self.seconds_to_next_hour() + self.delay)
+            self._age()
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Refresher error: {e}")
+
+    def start(self):
+        """Schedule run() on the running event loop, returns the task."""
+        return asyncio.get_running_loop().create_task(self.run())
+
+    def stats(self):
+        with self._lock:
+            tracked = len(self.counts)
+        return {
+            "tracked_cities": tracked,
+            "hot_cities": self.hot_cities(),
+            "refreshes": self.refreshes,
+            "last_refresh": self.last_refresh.isoformat() if self.last_refresh else None,
+            "last_refresh_s": round(self.last_refresh_s, 3) if self.last_refresh_s is not None else None,
+            "last_cities": self.last_cities,
+        }
+
+
+REFRESHER = ForecastRefresher()
+
+
+if __name__ == "__main__":
+    import sys
+
+    import http_client
+
+    async def demo():
+        # warm the given cities once, then time a "user" query for each
+        refresher = ForecastRefresher()
+        for city in sys.argv[1:] or ["Bucharest", "Cluj-Napoca", "Iasi"]:
+            refresher.record(city)
+        await refresher.refresh()
+        for city in refresher.hot_cities():
+            start = time.perf_counter()
+            result = await FORECAST_CACHE.get(city, prediction.predict_weather_async)
+            print(f"{city}: {result['status'] if result else None} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        # one loop for the whole run, so the pooled connections are closed on it
+        await http_client.ASYNC_HTTP.aclose()
+        print(refresher.stats())
+
+    asyncio.run(demo())
+    print(FORECAST_CACHE.stats())
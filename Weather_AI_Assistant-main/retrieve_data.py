@@ -3,6 +3,8 @@ from tqdm import tqdm
 import requests
 import pandas as pd
 
+import http_client
+
 BUCHAREST = (44.4268, 26.1025)
 IASI = (47.1622, 27.5889)
 CLUJ_NAPOCA = (46.7667, 23.6000)
@@ -57,6 +59,10 @@ BRAGADIRU = (44.3708, 25.9750)
 CITIES = [BUCHAREST, IASI, CLUJ_NAPOCA, TIMISOARA, CONSTANTA, CRAIOVA, BRASOV, GALATI, PLOIESTI, ORADEA, BRAILA, ARAD, PITESTI, SIBIU, BACAU, TARGU_MURES, BAIA_MARE, BUZAU, RAMNICU_VALCEA, SATU_MARE, BOTOSANI, SUCEAVA, RESITA, DROBETA_TURNU_SEVERIN, PIATRA_NEAMT,
           BISTRITA, TARGU_JIU, TARGOVISTE, FOCSANI, TULCEA, ALBA_IULIA, SLATINA, VASLUI, CALARASI, GIURGIU, POPESTI_LEORDENI, DEVA, BARLAD, ZALAU, HUNEDOARA, FLORESTI, SFANTU_GHEORGHE, ROMAN, VOLUNTARI, TURDA, MIERCUREA_CIUC, SLOBOZIA, ALEXANDRIA, BRAGADIRU]
 
+# same order as CITIES (used to pre-seed the geocoding cache)
+CITY_NAMES = ["Bucharest", "Iasi", "Cluj-Napoca", "Timisoara", "Constanta", "Craiova", "Brasov", "Galati", "Ploiesti", "Oradea", "Braila", "Arad", "Pitesti", "Sibiu", "Bacau", "Targu Mures", "Baia Mare", "Buzau", "Ramnicu Valcea", "Satu Mare", "Botosani", "Suceava", "Resita", "Drobeta-Turnu Severin", "Piatra Neamt",
+              "Bistrita", "Targu Jiu", "Targoviste", "Focsani", "Tulcea", "Alba Iulia", "Slatina", "Vaslui", "Calarasi", "Giurgiu", "Popesti-Leordeni", "Deva", "Barlad", "Zalau", "Hunedoara", "Floresti", "Sfantu Gheorghe", "Roman", "Voluntari", "Turda", "Miercurea Ciuc", "Slobozia", "Alexandria", "Bragadiru"]
+
 
 BASE_URL = "https://historical-forecast-api.open-meteo.com/v1/forecast"
 TIMEZONE = "UTC"
@@ -103,10 +109,10 @@ def download_city_data(lat, lon, city_id, max_retries=3):
                     "timezone": TIMEZONE,
                 }
 
-                resp = requests.get(BASE_URL, params=params, timeout=(10, 180))
+                # pooled keep-alive session, retries 429/5xx by itself
                 # (connect time out , read time out)
-                resp.raise_for_status()
-                data = resp.json()
+                data = http_client.get_json(
+                    BASE_URL, params=params, timeout=(10, 180))
 
                 if elevation_value is None:
                     elevation_value = data.get("elevation", None)
@@ -125,7 +131,8 @@ def download_city_data(lat, lon, city_id, max_retries=3):
                 dfs.append(df)
                 break
 
-            except requests.exceptions.ReadTimeout:
+            except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError):
+                # read timeouts come back as ConnectionError once the session retries are used up
                 print(
                     f"[TIMEOUT] city {city_id}, {start_date}–{end_date}, attempt {attempt+1}")
                 time.sleep(5)
@@ -143,12 +150,13 @@ def download_city_data(lat, lon, city_id, max_retries=3):
 # START_INDEX = 37 - Had to many requests after city number 37
 
 
-for idx, (lat, lon) in enumerate(tqdm(CITIES)):
-    # if idx < START_INDEX:
-    #     continue
+if __name__ == "__main__":
+    for idx, (lat, lon) in enumerate(tqdm(CITIES)):
+        # if idx < START_INDEX:
+        #     continue
 
-    df_city = download_city_data(lat, lon, idx)
-    if df_city is not None:
-        df_city.to_csv(f"weather_ro_city_{idx}.csv", index=False)
+        df_city = download_city_data(lat, lon, idx)
+        if df_city is not None:
+            df_city.to_csv(f"weather_ro_city_{idx}.csv", index=False)
 
-    time.sleep(10)  # small pause to reduce rate-limit risk
+        time.sleep(10)  # small pause to reduce rate-limit risk
@@ -0,0 +1,59 @@
+# Stress check for the thread-safety of prediction.Predictor.
+#
+# Runs hundreds of city requests on a thread pool against ONE shared
+# Predictor and compares every answer with the answer computed for the same
+# city sequentially. A request that picked up another city's location
+# (the old CURRENT_LAT/LON globals bug) shows up as a mismatch.
+#
+# The parallel pass uses its own Predictor that never reuses a result of
+# the same grid cell and hour, and starts with an empty observation cache:
+# otherwise it would be served from what the reference pass computed and
+# nothing (fetch, preprocessing, model) would actually run concurrently.
+#
+# usage: python stress_predictor.py [requests] [threads]
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import prediction
+from obs_cache import ObservationCache
+from prediction import Predictor
+from retrieve_data import CITY_NAMES
+
+
+class UnsharedPredictor(Predictor):
+    """Every request runs the whole pipeline, no per-(cell, hour) reuse."""
+
+    def _shared_get(self, city, coords, hour):
+        return None
+
+
+def main(total=400, workers=32):
+    # sequential reference on its own Predictor
+    reference = Predictor()
+    expected = {city: reference.predict(city) for city in CITY_NAMES}
+
+    prediction.OBS_CACHE = ObservationCache(prediction.PAST_HOURS)
+    predictor = UnsharedPredictor()
+
+    cities = [CITY_NAMES[i % len(CITY_NAMES)] for i in range(total)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(predictor.predict, cities))
+    elapsed = time.perf_counter() - start
+
+    mismatches = [city for city, result in zip(cities, results)
+                  if result != expected[city]]
+
+    print("\n========== STRESS RESULT ==========")
+    print(f"requests: {total}  threads: {workers}  time: {elapsed:.2f}s")
+    print(f"mismatches: {len(mismatches)}")
+    if mismatches:
+        print("first mismatching cities:", sorted(set(mismatches))[:10])
+    return not mismatches
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    sys.exit(0 if main(total, workers) else 1)
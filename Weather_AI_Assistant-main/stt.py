@@ -0,0 +1,232 @@
+import importlib.util
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# which recognizer turns the ESP32 recordings into text: google (online,
+# whole utterance), vosk (offline, streamed while recording) or auto (vosk
+# when the package and its model folder are there, google otherwise)
+STT_ENGINE = os.environ.get("WEATHER_STT", "auto")
+VOSK_MODEL_PATH = os.environ.get("VOSK_MODEL_PATH", "vosk-model-small-en-us-0.15")
+
+SAMPLE_RATE = 16000     # the ESP32 sends unsigned 8-bit 16 kHz mono
+
+
+def u8_to_s16(pcm):
+    """Unsigned 8-bit PCM -> signed 16-bit little endian."""
+    return ((np.frombuffer(pcm, dtype=np.uint8).astype(np.int16) - 128) << 8).astype('<i2').tobytes()
+
+
+class STTEngine:
+    """
+    Common interface of every speech recognizer. session() starts one
+    utterance: feed(pcm) takes raw ESP32 chunks as they arrive and
+    result() returns the transcript once the recording is over.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.load_s = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load once (from preload or on the first utterance)."""
+        with self._lock:
+            if self.load_s is None:
+                start = time.perf_counter()
+                self._load()
+                self.load_s = time.perf_counter() - start
+        return self
+
+    def _load(self):
+        pass
+
+    def session(self):
+        raise NotImplementedError
+
+
+class GoogleSession:
+    def __init__(self):
+        self.pcm = bytearray()
+
+    def feed(self, pcm):
+        self.pcm.extend(pcm)
+
+    def result(self):
+        import speech_recognition as sr
+        # AudioData keeps 8-bit audio signed (like AudioFile does after reading a WAV)
+        signed = (np.frombuffer(self.pcm, dtype=np.uint8).astype(np.int16) - 128).astype(np.int8)
+        audio = sr.AudioData(signed.tobytes(), SAMPLE_RATE, 1)
+        return sr.Recognizer().recognize_google(audio, language="en-US")
+
+
+class GoogleEngine(STTEngine):
+    """speech_recognition + Google Web Speech: needs internet, starts after release."""
+
+    name = "google"
+
+    def _load(self):
+        import speech_recognition  # noqa: F401
+
+    def session(self):
+        return GoogleSession()
+
+
+class VoskSession:
+    def __init__(self, model):
+        from vosk import KaldiRecognizer
+        self.recognizer = KaldiRecognizer(model, SAMPLE_RATE)
+        self.texts = []
+
+    def feed(self, pcm):
+        # True when vosk closed a phrase (pause in the speech)
+        if self.recognizer.AcceptWaveform(u8_to_s16(pcm)):
+            self.texts.append(json.loads(self.recognizer.Result())["text"])
+
+    def result(self):
+        self.texts.append(json.loads(self.recognizer.FinalResult())["text"])
+        text = " ".join(t for t in self.texts if t)
+        if not text:
+            raise ValueError("no speech recognized")
+        return text
+
+
+class VoskEngine(STTEngine):
+    """Vosk (Kaldi) on the CPU, offline, decoding while the ESP32 still records."""
+
+    name = "vosk"
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        super().__init__()
+        self.model_path = model_path
+        self.model = None
+
+    def _load(self):
+        from vosk import Model, SetLogLevel
+        SetLogLevel(-1)
+        self.model = Model(self.model_path)
+
+    def session(self):
+        return VoskSession(self.model)
+
+
+STT_ENGINES = {
+    "google": GoogleEngine,
+    "vosk": VoskEngine,
+}
+
+
+def create_engine(name=STT_ENGINE):
+    if name == "auto":
+        vosk_ready = importlib.util.find_spec("vosk") is not None and os.path.isdir(VOSK_MODEL_PATH)
+        name = "vosk" if vosk_ready else "google"
+    if name not in STT_ENGINES:
+        raise ValueError(f"unknown STT engine: {name} (choose from {', '.join(STT_ENGINES)}, auto)")
+    return STT_ENGINES[name]()
+
+
+class Transcriber:
+    """
+    Feeds the bridge's chunks to the engine on its own thread while the
+    ESP32 is still recording (the serial reader never waits for the
+    recognizer). feed() opens a session on the first chunk of an utterance;
+    finish() closes it and returns a Future with the transcript.
+    """
+
+    def __init__(self, engine=None, name="stt"):
+        self.engine = engine or create_engine()
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.utterances = 0
+        self.finish_s = 0.0
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+                self._thread.start()
+
+    def feed(self, pcm):
+        self._ensure_worker()
+        self._queue.put(("chunk", bytes(pcm)))
+
+    def finish(self):
+        """Future with the transcript (cancel() skips the final decode)."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put(("end", future))
+        return future
+
+    def _worker(self):
+        session, error = None, None
+        while True:
+            kind, payload = self._queue.get()
+            if kind == "chunk":
+                if error is not None:
+                    continue
+                try:
+                    if session is None:
+                        session = self.engine.load().session()
+                    session.feed(payload)
+                except Exception as e:
+                    error = e
+                continue
+
+            # end of the utterance: only what is left of the decoding remains
+            start = time.perf_counter()
+            try:
+                if not payload.set_running_or_notify_cancel():
+                    continue            # the turn was cancelled meanwhile
+                if error is not None:
+                    raise error
+                if session is None:
+                    raise ValueError("empty recording")
+                payload.set_result(session.result())
+            except Exception as e:
+                payload.set_exception(e)
+            finally:
+                session, error = None, None
+            with self._lock:
+                self.utterances += 1
+                self.finish_s += time.perf_counter() - start
+
+    def stats(self):
+        with self._lock:
+            return {
+                "engine": self.engine.name,
+                "load_s": round(self.engine.load_s, 2) if self.engine.load_s is not None else None,
+                "utterances": self.utterances,
+                "mean_finish_ms": round(self.finish_s / self.utterances * 1000, 1) if self.utterances else None,
+            }
+
+
+TRANSCRIBER = Transcriber()
+
+
+if __name__ == "__main__":
+    # python stt.py recording.wav [engine]: replays a WAV in bridge-sized chunks
+    import sys
+    import wave
+
+    if len(sys.argv) > 2:
+        TRANSCRIBER = Transcriber(create_engine(sys.argv[2]))
+    TRANSCRIBER.engine.load()
+    with wave.open(sys.argv[1], 'rb') as wf:
+        if (wf.getsampwidth(), wf.getnchannels(), wf.getframerate()) != (1, 1, SAMPLE_RATE):
+            sys.exit("expected unsigned 8-bit 16 kHz mono (audio_folder/audio.wav)")
+        pcm = wf.readframes(wf.getnframes())
+    for i in range(0, len(pcm), 512):
+        TRANSCRIBER.feed(pcm[i:i + 512])
+        time.sleep(512 / SAMPLE_RATE)      # real time, like the ESP32
+    released = time.perf_counter()
+    text = TRANSCRIBER.finish().result()
+    print(f"'{text}' ready {(time.perf_counter() - released) * 1000:.0f} ms after release")
+    print(TRANSCRIBER.stats())
@@ -1,5 +1,7 @@
 import numpy as np
 import glob
+import os
+import sys
 import tensorflow as tf
 import random
 
@@ -10,9 +12,25 @@ TARGETS = 4
 
 BATCH_SIZE = 64
 
+# python training.py distill [gru|conv]  -> small student taught by the LSTM
+MODE = sys.argv[1] if len(sys.argv) > 1 else "train"
+TEACHER_PATH = "weather_lstm_6h_prediction.keras"
+STUDENT_KIND = sys.argv[2] if len(sys.argv) > 2 else "gru"
+STUDENT_PATH = f"weather_student_{STUDENT_KIND}.keras"
+DISTILL_REPORT = "distillation_report.json"
+ALPHA = 0.3          # weight of the real targets, the rest comes from the teacher
+TEMPERATURE = 2.0    # softens teacher and student class probabilities in the KD loss
+
 x_files = sorted(glob.glob("X_train_part_*.npy"))
 y_files = sorted(glob.glob("y_train_part_*.npy"))
 
+# distill keeps ~10% of the chunk files away from the student, the report
+# scores teacher and student on them (the teacher did see them in training,
+# so the student's accuracy loss is, if anything, overstated)
+HOLDOUT = max(1, len(x_files) // 10) if MODE == "distill" and len(x_files) > 1 else 0
+holdout_x_files, holdout_y_files = x_files[len(x_files) - HOLDOUT:], y_files[len(y_files) - HOLDOUT:]
+x_files, y_files = x_files[:len(x_files) - HOLDOUT], y_files[:len(y_files) - HOLDOUT]
+
 
 def chunk_loader(x_files, y_files):
     file_pairs = list(zip(x_files, y_files))
@@ -59,6 +77,144 @@ val_dataset = dataset.take(100)
 train_dataset = dataset.skip(100)
 
 
+# =============   DISTILLATION =============
+
+def build_student(kind):
+    """
+    A few thousand parameters instead of ~125k, same inputs / outputs, so
+    the keras, onnx and tflite backends serve it as is (not numpy, which
+    only runs the LSTM).
+    """
+    inputs = tf.keras.Input(shape=(TIME_STAMP, FEATURES))
+    if kind == "gru":
+        x = tf.keras.layers.GRU(32)(inputs)
+        x = tf.keras.layers.RepeatVector(FUTURE_HORIZON)(x)
+        x = tf.keras.layers.GRU(32, return_sequences=True)(x)
+    elif kind == "conv":
+        x = tf.keras.layers.Conv1D(32, 5, strides=2, activation="relu")(inputs)
+        x = tf.keras.layers.Conv1D(32, 3, strides=2, activation="relu")(x)
+        x = tf.keras.layers.GlobalAveragePooling1D()(x)
+        x = tf.keras.layers.Dense(FUTURE_HORIZON * 32, activation="relu")(x)
+        x = tf.keras.layers.Reshape((FUTURE_HORIZON, 32))(x)
+    else:
+        raise ValueError(f"unknown student: {kind} (gru or conv)")
+
+    regression_output = tf.keras.layers.TimeDistributed(
+        tf.keras.layers.Dense(3), name="regression")(x)
+    # logits kept as their own layer: training softens them by TEMPERATURE,
+    # the served model outputs plain softmax(logits) like the teacher
+    logits = tf.keras.layers.TimeDistributed(
+        tf.keras.layers.Dense(7), name="classification_logits")(x)
+    classification_output = tf.keras.layers.Softmax(name="classification")(logits)
+    return tf.keras.Model(inputs=inputs, outputs=[regression_output, classification_output],
+                          name=f"student_{kind}")
+
+
+def kd_training_model(student):
+    """student + a "soft" output softmax(logits / T), sharing all weights."""
+    logits = student.get_layer("classification_logits").output
+    soft = tf.keras.layers.Softmax(name="soft")(
+        tf.keras.layers.Rescaling(1.0 / TEMPERATURE)(logits))
+    regression, classification = student.outputs
+    return tf.keras.Model(inputs=student.inputs, outputs={
+        "regression": regression, "classification": classification, "soft": soft})
+
+
+def distill(kind):
+    teacher = tf.keras.models.load_model(TEACHER_PATH)
+    teacher.trainable = False
+
+    def teacher_targets(x, y):
+        reg_teacher, cls_teacher = teacher(x, training=False)
+        # the teacher only outputs probabilities: p^(1/T) renormalized is
+        # softmax(log p / T), i.e. its logits softened by the same T
+        soft = tf.pow(cls_teacher, 1.0 / TEMPERATURE)
+        soft = soft / tf.reduce_sum(soft, axis=-1, keepdims=True)
+        return x, {
+            "regression": ALPHA * y["regression"] + (1 - ALPHA) * reg_teacher,
+            "classification": y["classification"],
+            "soft": soft,
+        }
+
+    student = build_student(kind)
+    trainer = kd_training_model(student)
+    # standard KD loss: hard labels on softmax(z), soft targets on
+    # softmax(z / T) scaled by T^2 to keep its gradients comparable
+    trainer.compile(
+        optimizer="adam",
+        loss={"regression": "mse",
+              "classification": "sparse_categorical_crossentropy",
+              "soft": "categorical_crossentropy"},
+        loss_weights={"regression": 1.0,
+                      "classification": ALPHA,
+                      "soft": (1 - ALPHA) * TEMPERATURE ** 2},
+        metrics={"regression": "mae", "classification": "accuracy"},
+    )
+    student.summary()
+
+    trainer.fit(
+        train_dataset.map(teacher_targets),
+        validation_data=val_dataset.map(teacher_targets),
+        epochs=30,
+        callbacks=[
+            tf.keras.callbacks.EarlyStopping(
+                monitor="val_loss", patience=3, restore_best_weights=True, verbose=1),
+            tf.keras.callbacks.ReduceLROnPlateau(
+                monitor="val_loss", factor=0.5, patience=1, verbose=1),
+        ],
+    )
+    student.save(STUDENT_PATH)
+    print(f"student saved -> {STUDENT_PATH}")
+
+    # accuracy loss vs speed-up, on the real (unscaled) targets of the
+    # held-out chunks
+    import tempfile
+    from quantize import report
+    candidates = {
+        "teacher lstm": ("keras", TEACHER_PATH),
+        f"student {kind}": ("keras", STUDENT_PATH),
+    }
+    tmp_dir = tempfile.TemporaryDirectory()
+    try:
+        # keras predict() overhead hides the compute at batch 1, onnx does not;
+        # the teacher goes to a temp file, never over an existing .onnx
+        from backends import convert_to_onnx
+        student_onnx = STUDENT_PATH.replace(".keras", ".onnx")
+        teacher_onnx = os.path.join(tmp_dir.name, "teacher.onnx")
+        convert_to_onnx(TEACHER_PATH, teacher_onnx)
+        convert_to_onnx(STUDENT_PATH, student_onnx)
+        candidates["teacher onnx"] = ("onnx", teacher_onnx)
+        candidates[f"student {kind} onnx"] = ("onnx", student_onnx)
+    except ImportError:
+        print("tf2onnx not installed, keras latency only")
+    holdout = (holdout_x_files, holdout_y_files) if HOLDOUT else None
+    if holdout is None:
+        print("only one chunk file: evaluating on training windows")
+    try:
+        results = report(candidates, out_path=DISTILL_REPORT, title="Distillation report",
+                         files=holdout)
+    finally:
+        tmp_dir.cleanup()
+
+    print(f"\nparameters: teacher {teacher.count_params():,}  student {student.count_params():,}")
+    for runtime in ("", " onnx"):
+        base = results.get(f"teacher {'lstm' if not runtime else 'onnx'}")
+        small = results.get(f"student {kind}{runtime}")
+        if base and small:
+            print(f"speed-up{runtime or ' keras'}: x{base['latency_ms_batch_1'] / small['latency_ms_batch_1']:.1f} at batch 1, "
+                  f"x{base['latency_ms_batch_256'] / small['latency_ms_batch_256']:.1f} at batch 256")
+    base, small = results["teacher lstm"], results[f"student {kind}"]
+    print(f"temp MAE {base['temp_mae']:.3f} -> {small['temp_mae']:.3f} °C, "
+          f"wind MAE {base['wind_mae']:.3f} -> {small['wind_mae']:.3f} km/h, "
+          f"accuracy {base['class_accuracy']:.3f} -> {small['class_accuracy']:.3f}, "
+          f"spoken condition same as teacher {small['label_agreement_vs_float']:.1%}")
+
+
+if MODE == "distill":
+    distill(STUDENT_KIND)
+    sys.exit(0)
+
+
 #  MODEL
 
 inputs = tf.keras.Input(shape=(TIME_STAMP, FEATURES))
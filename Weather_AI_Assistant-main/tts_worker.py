@@ -0,0 +1,195 @@
+import asyncio
+import atexit
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+# Add parent dir to find stream_audio.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# what the ESP32 DAC plays (esp/esp.ino): unsigned 8-bit, 16 kHz, mono
+SAMPLE_RATE = 16000
+SAFT16kHz8BitMono = 16          # SAPI SpeechAudioFormatType
+VOICE_HINTS = ("zira", "female")
+# engines rendering at the same time (one thread each); more than 1 only
+# helps when several devices are talking
+TTS_WORKERS = int(os.environ.get("WEATHER_TTS_WORKERS", 1))
+
+
+class TTSWorker:
+    """
+    Long-lived threads, each owning one TTS engine (SAPI and pyttsx3 engines
+    must stay on the thread that created them). The voice is picked once,
+    and every text is rendered straight to raw unsigned 8-bit 16 kHz mono
+    PCM in memory, ready for AudioBridge.play_pcm.
+
+    On Windows SAPI renders into an SpMemoryStream already in that format;
+    elsewhere (or without comtypes) pyttsx3 renders to one reused temp WAV
+    per thread (deleted by stop(), at exit) that is converted once here,
+    never at play time.
+    """
+
+    def __init__(self, workers=TTS_WORKERS):
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._threads = []
+        self._temp_files = []
+        self._lock = threading.Lock()
+        self.backend = None
+        self.voice = None
+        self.renders = 0
+        self.render_s = 0.0
+
+    def start(self):
+        with self._lock:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._worker, name=f"tts-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        """End the worker threads (after the queued texts) and delete their temp WAVs."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+        with self._lock:
+            paths, self._temp_files = self._temp_files, []
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def submit(self, text):
+        """Future resolving to the PCM bytes of text (cancel() drops it if not started)."""
+        self.start()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def render(self, text):
+        return self.submit(text).result()
+
+    async def render_async(self, text):
+        return await asyncio.wrap_future(self.submit(text))
+
+    # ============= WORKER THREAD =============
+
+    def _engine(self):
+        if sys.platform == "win32":
+            try:
+                return self._sapi()
+            except Exception as e:
+                print(f"SAPI unavailable ({e}), using pyttsx3")
+        return self._pyttsx3()
+
+    def _worker(self):
+        try:
+            speak, error = self._engine(), None
+        except Exception as e:
+            print(f"TTS engine failed to start: {e}")
+            speak, error = None, e
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            text, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            if speak is None:
+                future.set_exception(RuntimeError(f"no TTS engine: {error}"))
+                continue
+            start = time.perf_counter()
+            try:
+                future.set_result(speak(text))
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            with self._lock:
+                self.renders += 1
+                self.render_s += time.perf_counter() - start
+
+    def _sapi(self):
+        import comtypes
+        import comtypes.client
+
+        comtypes.CoInitialize()
+        voice = comtypes.client.CreateObject("SAPI.SpVoice")
+        for token in voice.GetVoices():
+            name = token.GetDescription()
+            if any(hint in name.lower() for hint in VOICE_HINTS):
+                voice.Voice = token
+                self.voice = name
+                break
+
+        def speak(text):
+            stream = comtypes.client.CreateObject("SAPI.SpMemoryStream")
+            stream.Format.Type = SAFT16kHz8BitMono
+            voice.AudioOutputStream = stream
+            voice.Speak(text)
+            return bytes(bytearray(stream.GetData()))
+
+        self.backend = "sapi"
+        return speak
+
+    def _pyttsx3(self):
+        import pyttsx3
+        import stream_audio
+
+        # not pyttsx3.init(): it hands out one cached engine per driver,
+        # and every worker thread needs its own
+        engine = pyttsx3.Engine()
+        for v in engine.getProperty('voices'):
+            if any(hint in v.name.lower() for hint in VOICE_HINTS):
+                engine.setProperty('voice', v.id)
+                self.voice = v.name
+                break
+
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        with self._lock:
+            self._temp_files.append(path)
+
+        def speak(text):
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+            return stream_audio.wav_to_pcm(path)
+
+        self.backend = "pyttsx3"
+        return speak
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "workers": self.workers,
+                "voice": self.voice,
+                "renders": self.renders,
+                "mean_ms": round(self.render_s / self.renders * 1000, 1) if self.renders else None,
+            }
+
+
+TTS = TTSWorker()
+atexit.register(TTS.stop)
+
+
+if __name__ == "__main__":
+    # python tts_worker.py "text" [out.wav]
+    import stream_audio
+
+    text = sys.argv[1] if len(sys.argv) > 1 else "Great, here are the results for Iasi."
+    for _ in range(3):
+        pcm = TTS.render(text)
+    print(f"{len(pcm)} bytes = {len(pcm) / SAMPLE_RATE:.2f}s of audio, {TTS.stats()}")
+    if len(sys.argv) > 2:
+        stream_audio.save_wav(sys.argv[2], pcm)
+        print(f"saved {sys.argv[2]}")
@@ -1,7 +1,7 @@
 import serial
 import wave
 import time
-import struct
+import queue
 import sys
 import os
 import serial.tools.list_ports
@@ -39,17 +39,73 @@ def get_serial_port():
     except:
         return None
 
+# AUDIO_DEBUG_FILES=1 also writes every utterance / reply as a WAV file
+# (audio_folder/audio.wav, reply.wav) when the bridge runs with callbacks.
+DEBUG_FILES = os.environ.get("AUDIO_DEBUG_FILES") == "1"
+PLAYBACK_CHUNK = 1024
+
+
+def save_wav(path, pcm):
+    """Raw unsigned 8-bit 16 kHz mono -> WAV file."""
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(CHANNELS)
+        wf.setsampwidth(WIDTH)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm)
+
+
+def to_pcm_u8(data, width, channels, rate, target_rate=SAMPLE_RATE):
+    """Any PCM (8/16-bit, mono/stereo, any rate) -> unsigned 8-bit mono at target_rate."""
+    import numpy as np
+
+    if width == 1:
+        samples = np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128
+    elif width == 2:
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32) / 256
+    else:
+        raise ValueError(f"unsupported sample width: {width}")
+    samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)[:, 0]
+
+    if rate != target_rate and len(samples):
+        positions = np.arange(0, len(samples) - 1, rate / target_rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return np.clip(np.round(samples + 128), 0, 255).astype(np.uint8).tobytes()
+
+
+def wav_to_pcm(filename):
+    """WAV file -> the raw unsigned 8-bit 16 kHz mono the ESP32 DAC plays."""
+    with wave.open(filename, 'rb') as wf:
+        return to_pcm_u8(wf.readframes(wf.getnframes()), wf.getsampwidth(),
+                         wf.getnchannels(), wf.getframerate())
+
+
 class AudioBridge:
-    def __init__(self, port):
+    """
+    Serial link to the ESP32.
+
+    With on_utterance, every recording is handed over as raw PCM bytes
+    (unsigned 8-bit, 16 kHz, mono) and replies are queued in memory with
+    play_pcm(); files are only written when AUDIO_DEBUG_FILES=1. Without it
+    the bridge works with audio_folder/audio.wav and reply.wav as before.
+    on_chunk gets every piece of a recording as soon as it is read, for a
+    recognizer that decodes while the button is still held.
+    """
+
+    def __init__(self, port, on_utterance=None, on_chunk=None, debug_files=DEBUG_FILES):
         self.ser = serial.Serial(port, BAUD_RATE, timeout=0.1)
         self.last_reply_mtime = 0
-        
+        self.on_utterance = on_utterance
+        self.on_chunk = on_chunk
+        self.debug_files = debug_files
+        self.playback = queue.Queue()    # PCM buffers waiting for the speaker
+
         # Ensure audio folder exists
         if not os.path.exists(AUDIO_FOLDER):
             os.makedirs(AUDIO_FOLDER)
             
         print(f"Connected to {port} at {BAUD_RATE}")
-        print(f"Monitoring {AUDIO_FOLDER}...")
+        if on_utterance is None:
+            print(f"Monitoring {AUDIO_FOLDER}...")
 
     def listen(self):
         print("\nListening for incoming audio from ESP32... (Press Ctrl+C to stop)")
@@ -58,7 +114,9 @@ class AudioBridge:
                 try:
                     # 1. Check if ESP32 is sending data (Recording)
                     if self.ser.in_waiting > 0:
-                        self.record_stream()
+                        frames = self.record_stream()
+                        if self.on_utterance is not None and frames:
+                            self.on_utterance(bytes(frames))
                 except serial.SerialException as e:
                     print(f"Serial Error: {e}. Retrying in 1s...")
                     time.sleep(1)
@@ -67,9 +125,18 @@ class AudioBridge:
                     print(f"OS Error: {e}. Retrying...")
                     time.sleep(1)
                     continue
-                
-                # 2. Check if there is a new reply to play
-                if os.path.exists(OUTPUT_FILE):
+
+                # 2. Play what was queued in memory
+                try:
+                    pcm = self.playback.get_nowait()
+                except queue.Empty:
+                    pcm = None
+                if pcm is not None:
+                    self._send_pcm(pcm)
+                    continue
+
+                # 3. File mode: check if there is a new reply to play
+                if self.on_utterance is None and os.path.exists(OUTPUT_FILE):
                     try:
                         mtime = os.path.getmtime(OUTPUT_FILE)
                         # Debounce: Ensure file is at least 1 second newer than last play
@@ -106,6 +173,8 @@ class AudioBridge:
             if self.ser.in_waiting > 0:
                 chunk = self.ser.read(self.ser.in_waiting)
                 frames.extend(chunk)
+                if self.on_chunk is not None:
+                    self.on_chunk(chunk)
                 last_data_time = time.time()
                 # progress indicator
                 if len(frames) % 4000 == 0:
@@ -117,87 +186,56 @@ class AudioBridge:
                 time.sleep(0.005)
                 
         print(f"\nRecording finished. captured {len(frames)} bytes.")
-        
-        # Save to WAV
-        try:
-            with wave.open(INPUT_FILE, 'wb') as wf:
-                wf.setnchannels(CHANNELS)
-                wf.setsampwidth(WIDTH)
-                wf.setframerate(SAMPLE_RATE)
-                wf.writeframes(frames)
-            print(f"Saved to {INPUT_FILE}")
-        except Exception as e:
-            print(f"Error saving file: {e}")
 
-    def play_file(self, filename):
-        print(f"Playing {filename}...")
-        try:
-            wf = wave.open(filename, 'rb')
-        except wave.Error:
-            print(f"Error: {filename} is not a valid WAVE file. (Is it MP3?)")
-            return
-        except FileNotFoundError:
-            print("File not found.")
-            return
+        if self.on_utterance is None or self.debug_files:
+            try:
+                save_wav(INPUT_FILE, frames)
+                print(f"Saved to {INPUT_FILE}")
+            except Exception as e:
+                print(f"Error saving file: {e}")
+        return frames
 
-        # Audio parameters
-        channels = wf.getnchannels()
-        width = wf.getsampwidth()
-        rate = wf.getframerate()
-        
-        chunk_size = 1024
+    def play_pcm(self, pcm):
+        """Queue raw unsigned 8-bit 16 kHz PCM for the speaker (any thread)."""
+        if self.debug_files:
+            save_wav(OUTPUT_FILE, pcm)
+        self.playback.put(pcm)
+
+    def clear_playback(self):
+        """Drop the replies not yet playing (the user asked something new)."""
+        while True:
+            try:
+                self.playback.get_nowait()
+            except queue.Empty:
+                return
+
+    def _send_pcm(self, pcm):
         target_rate = 16000 # ESP32 playback rate
-        
-        # Rudimentary resampling/skipping if rate is different (ESP32 expects ~16k)
-        # Assuming 16kHz for now or handling speedup by simple skip
-        skip = 1
-        if rate > target_rate:
-            skip = int(rate / target_rate)
-            
-        # Volume/Normalization could go here
-        
-        data = wf.readframes(chunk_size)
-        total_sent = 0
-        
-        while len(data) > 0:
+        for start in range(0, len(pcm), PLAYBACK_CHUNK):
             start_t = time.time()
-            
-            # Prepare data for ESP32 (Single byte, raw)
-            # This logic assumes the WAV is already roughly compatible or needs simple conversion
-            # For robustness, we might want to just send the raw bytes if it matches.
-            
-            output_chunk = bytearray()
-            
-            # Simple conversion loop
-            step = width * channels
-            for i in range(0, len(data), step * skip):
-                if i+step > len(data): break
-                
-                # Resample logic (very basic)
-                sample_val = 0
-                if width == 1:
-                    sample_val = data[i]
-                elif width == 2:
-                    # 16-bit signed to 8-bit unsigned
-                    val = struct.unpack('<h', data[i:i+2])[0]
-                    sample_val = (val + 32768) >> 8
-                
-                output_chunk.append(sample_val)
-                
+            output_chunk = pcm[start:start + PLAYBACK_CHUNK]
             self.ser.write(output_chunk)
-            total_sent += len(output_chunk)
-            
+
             # Flow control
             # bytes / rate = duration
             duration = len(output_chunk) / target_rate
             elapsed = time.time() - start_t
             if duration > elapsed:
                 time.sleep(duration - elapsed)
-                
-            data = wf.readframes(chunk_size)
-            
+
+    def play_file(self, filename):
+        print(f"Playing {filename}...")
+        try:
+            pcm = wav_to_pcm(filename)
+        except wave.Error:
+            print(f"Error: {filename} is not a valid WAVE file. (Is it MP3?)")
+            return
+        except FileNotFoundError:
+            print("File not found.")
+            return
+
+        self._send_pcm(pcm)
         print("\nPlayback finished.")
-        wf.close()
 
 if __name__ == "__main__":
     port = get_serial_port()